@@ -0,0 +1,138 @@
+# bench_gp.py
+"""
+GP değerlendirme katmanı benchmark'ı: eski pandas Series primitifleri vs NumPy (GP_ARRAY_OPS,
+gp.compile ile) vs gp_compile closure'ları (terminal = tablo indeksi, eval yok).
+Her nesilde aynı rastgele ağaç popülasyonu tüm katmanlarda değerlendirilir, giriş maskelerinin
+birebir aynı olduğu doğrulanır ve nesil başına süre / saniyede ağaç raporlanır.
+Backtest hariçtir: ölçülen süre sadece ağaç değerlendirme + maskeye dönüşümdür.
+
+Kullanım:
+    python bench_gp.py                       # rows=5000,50000  pop=200  gens=5
+    python bench_gp.py --rows 100000 --pop 500 --gens 3
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+from deap import gp
+
+from optimizer_api import GP_ARRAY_OPS, BitMask, gp_compile
+
+
+class SeriesT: pass
+class MaskT: pass
+
+
+def make_frame(n: int, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = pd.Series(50 + np.cumsum(rng.normal(0, 0.25, n)))
+    d = close.diff().fillna(0.0)
+    up = d.clip(lower=0).rolling(14, min_periods=1).mean()
+    dn = (-d).clip(lower=0).rolling(14, min_periods=1).mean()
+    return pd.DataFrame({
+        "close": close,
+        "SMA": close.rolling(50, min_periods=1).mean(),
+        "EMA": close.ewm(span=20, adjust=False).mean(),
+        "RSI": 100 - 100 / (1 + up / (dn + 1e-12)),
+        "mom": close.pct_change(10).fillna(0.0),
+        "vol": d.rolling(20, min_periods=1).std().fillna(0.0),
+    })
+
+
+def pandas_ops(index):
+    """generate_strategy_gp'nin NumPy öncesi primitifleri (referans)."""
+    def _S(x):
+        if isinstance(x, pd.Series):
+            return x
+        return pd.Series([x] * len(index), index=index, dtype=float)
+
+    def _div(a, b):
+        A, B = _S(a), _S(b)
+        Bz = B.where(B != 0.0, other=pd.NA)
+        return (A / Bz).fillna(0.0)
+
+    return {
+        "_add": lambda a, b: _S(a) + _S(b),
+        "_sub": lambda a, b: _S(a) - _S(b),
+        "_mul": lambda a, b: _S(a) * _S(b),
+        "_div": _div,
+        "_gt": lambda a, b: (_S(a) > _S(b)).astype(float),
+        "_lt": lambda a, b: (_S(a) < _S(b)).astype(float),
+        "_ge": lambda a, b: (_S(a) >= _S(b)).astype(float),
+        "_le": lambda a, b: (_S(a) <= _S(b)).astype(float),
+        "_and": lambda a, b: ((_S(a) != 0) & (_S(b) != 0)).astype(float),
+        "_or": lambda a, b: ((_S(a) != 0) | (_S(b) != 0)).astype(float),
+    }
+
+
+def build_psets(df: pd.DataFrame):
+    """Aynı isimlerle iki pset (pandas / NumPy) + closure katmanı için bağlam ve terminal tablosu."""
+    types = {"S": SeriesT, "M": MaskT}
+    ref = pandas_ops(df.index)
+    X = np.ascontiguousarray(df.to_numpy(dtype=np.float64).T)
+    out = {}
+    for kind in ("pandas", "numpy"):
+        pset = gp.PrimitiveSetTyped(f"B_{kind}", [], MaskT)
+        for name, fn, t_in, t_out in GP_ARRAY_OPS.values():
+            pset.addPrimitive(ref[name] if kind == "pandas" else fn, [types[t_in]] * 2, types[t_out], name=name)
+        for i, c in enumerate(df.columns):
+            pset.addTerminal(df[c] if kind == "pandas" else X[i], SeriesT, name=f"T{i}")
+        seed = (df["close"] > df["RSI"]).astype(float) if kind == "pandas" else BitMask.from_bool(X[0] > X[3])
+        pset.addTerminal(seed, MaskT, name="CMP0")
+        out[kind] = pset
+    # closure: aynı isimler, terminal değeri tablo indeksi
+    ctx = {name: fn for name, fn, _, _ in GP_ARRAY_OPS.values()}
+    ctx.update({f"T{i}": i for i in range(len(df.columns))})
+    ctx["CMP0"] = len(df.columns)
+    table = list(X) + [BitMask.from_bool(X[0] > X[3])]
+    return out, ctx, table
+
+
+def to_mask(out) -> np.ndarray:
+    if isinstance(out, pd.Series):
+        return out.fillna(0).clip(0, 1).to_numpy() != 0
+    if isinstance(out, BitMask):
+        return out.to_bool()
+    return np.asarray(out, dtype=bool)
+
+
+def run(rows: int, pop: int, gens: int, seed: int):
+    df = make_frame(rows, seed)
+    psets, ctx, table = build_psets(df)
+    times = {k: 0.0 for k in list(psets) + ["closure"]}
+    random.seed(seed)
+    for _ in range(gens):
+        trees = [gp.PrimitiveTree(gp.genHalfAndHalf(psets["numpy"], min_=2, max_=5)) for _ in range(pop)]
+        masks = {}
+        for kind, pset in psets.items():
+            t0 = time.perf_counter()
+            masks[kind] = [to_mask(gp.compile(str(t), pset)) for t in trees]
+            times[kind] += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        masks["closure"] = [to_mask(gp_compile(t, ctx)(table)) for t in trees]
+        times["closure"] += time.perf_counter() - t0
+        for a, b, c in zip(masks["pandas"], masks["numpy"], masks["closure"]):
+            assert np.array_equal(a, b) and np.array_equal(a, c), "katman maskeleri farklı"
+    return {k: (v / gens, pop * gens / v) for k, v in times.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="5000,50000")
+    ap.add_argument("--pop", type=int, default=200)
+    ap.add_argument("--gens", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    a = ap.parse_args()
+
+    print(f"{'rows':>8} {'layer':>7} {'gen_ms':>9} {'trees/s':>9} {'speedup':>8}")
+    for rows in [int(r) for r in a.rows.split(",")]:
+        res = run(rows, a.pop, a.gens, a.seed)
+        for kind, (per_gen, tps) in res.items():
+            sp = res["pandas"][0] / per_gen
+            print(f"{rows:>8} {kind:>7} {per_gen * 1000:>9.1f} {tps:>9.0f} {sp:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench_surrogate.py
+"""
+Bayesian surrogate benchmark: GP (gp_minimize) vs ağaç topluluğu (surrogate_minimize).
+Tipik 4–12 boyutlu uzaylarda değerlendirme sayısına karşı duvar saati ve en iyi değer.
+Objective ucuz (Ackley), böylece ölçülen süre neredeyse tamamen surrogate maliyetidir.
+
+Kullanım:
+    python bench_surrogate.py                      # dims=4,8,12  n_calls=100,200,300
+    python bench_surrogate.py --dims 6 --calls 400 --surrogates gp,et,rf
+"""
+import argparse
+import time
+
+import numpy as np
+
+from optimizer_api import gp_minimize, Real, surrogate_minimize
+
+
+def ackley(x) -> float:
+    x = np.asarray(x, dtype=float)
+    d = x.size
+    return float(-20.0 * np.exp(-0.2 * np.sqrt((x ** 2).sum() / d))
+                 - np.exp(np.cos(2 * np.pi * x).sum() / d) + 20.0 + np.e)
+
+
+def run(surrogate: str, dim: int, n_calls: int, refit_every: int, checkpoints):
+    stamps = []
+    t0 = time.perf_counter()
+
+    def f(x):
+        y = ackley(x)
+        stamps.append((time.perf_counter() - t0, y))
+        return y
+
+    if surrogate == "gp":
+        gp_minimize(f, [Real(-5.0, 5.0)] * dim, n_calls=n_calls, n_initial_points=10, random_state=42)
+    else:
+        surrogate_minimize(lambda xs: [f(x) for x in xs], [(-5.0, 5.0, False)] * dim, n_calls=n_calls,
+                           n_initial_points=10, surrogate=surrogate, refit_every=refit_every, seed=42)
+    rows = []
+    for c in checkpoints:
+        if c <= len(stamps):
+            rows.append((c, stamps[c - 1][0], min(y for _, y in stamps[:c])))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dims", default="4,8,12")
+    ap.add_argument("--calls", type=int, default=300)
+    ap.add_argument("--surrogates", default="gp,et,rf")
+    ap.add_argument("--refit-every", type=int, default=5)
+    a = ap.parse_args()
+
+    checkpoints = [c for c in (50, 100, 200, 300, 400, 600, 800) if c <= a.calls] or [a.calls]
+    print(f"{'dim':>4} {'surrogate':>9} {'evals':>6} {'wall_s':>9} {'best':>9}")
+    for dim in [int(d) for d in a.dims.split(",")]:
+        for sur in a.surrogates.split(","):
+            for c, wall, best in run(sur, dim, a.calls, a.refit_every, checkpoints):
+                print(f"{dim:>4} {sur:>9} {c:>6} {wall:>9.2f} {best:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
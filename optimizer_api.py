@@ -1,13 +1,14 @@
 # optimizer_api.py
 from __future__ import annotations
-import itertools, json, math, random, re, textwrap, time
+import heapq, itertools, json, math, os, random, re, textwrap, time
 from dataclasses import dataclass
+from types import SimpleNamespace
 import re, uuid, time
 import numpy as np
 import pandas as pd
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Any, Dict, Optional, Literal, List
+from typing import Any, Dict, Optional, Literal, List, Union
 from pydantic import BaseModel, Field, conint, confloat
 import asyncio
 from decimal import Decimal
@@ -19,7 +20,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 # Gerekli yeni importlar ve kütüphane kontrolü
 try:
-    from skopt import gp_minimize
+    from skopt import gp_minimize, Optimizer as SkOptimizer
     from skopt.space import Real, Integer
     from geneticalgorithm import geneticalgorithm as ga
     import optuna
@@ -1287,8 +1288,26 @@ class GPStrategyReq(BaseModel):
     mutation_prob: float = 0.2
     tournament_k: int = 5
     complexity_penalty: float = 0.001
+    max_height: int = 12          # sert sınır: crossover/mutasyon sonrası aşan çocuk ebeveyne döner
+    max_size: int = 60            # düğüm sayısı sınırı
+    selection: str = "tournament" # "tournament" | "double" (fitness + parsimony turnuvası) | "lexicographic"
+    parsimony_size: float = 1.4   # double: küçük ağacı seçme turnuvası (1..2)
     objective: str = "profit"  # "profit" | "sharpe" | "winRate"
     ind_params: Dict[str, Any] = {}    
+    max_seconds: Optional[float] = None  # bütçe: aşılınca en iyi-şimdiye-kadar (truncated=True)
+    max_evals: Optional[int] = None
+    n_jobs: Optional[int] = None  # fitness worker süreçleri (None = OPT_WORKERS)
+    islands: int = 1              # >1: island modeli, her ada population_size bireyle ayrı süreçte
+    migration_interval: int = 5   # kaç nesilde bir göç
+    migration_size: int = 2       # ada başına gönderilen elit sayısı
+    fidelity: str = "full"        # "full" | "proxy" (sonraki N bar getirisi) | "window" (son kesitte simülasyon)
+    promote_fraction: float = 0.3 # ucuz skorda en iyi bu kesir tam backtest'e terfi eder
+    proxy_horizon: int = 10
+    proxy_window: float = 0.25
+    subtree_cache_mb: float = 256.0  # alt ağaç sonuç önbelleği (koşu başına, LRU); 0 = kapalı
+    warm_start: bool = False  # önceki koşuların en iyi ağaçlarıyla başlangıç popülasyonu (aynı sembol/tf/yön/şema/objective)
+    checkpoint_every: int = 0     # >0: her N nesilde GP_CHECKPOINT_DIR/<run_id>.pkl (tek popülasyon modu)
+    run_id: Optional[str] = None  # checkpoint adı (None -> üretilir, yanıtta döner)
 
 # -----------------------------------------------------------------------------
 # Backtest (ORDI-style)
@@ -1317,8 +1336,242 @@ def _round_digits_by_price(price: float) -> int:
     k = int(np.floor(np.log10(p)))
     return int(max(0, 3 - k))  # dilediğin kalibrasyonu yap
 
-def walkforward_signals(df: pd.DataFrame, entries_signed: pd.Series, cfg: RunConfig) -> List[Dict[str, Any]]:
-    signals: List[Dict[str, Any]] = []
+# -----------------------------------------------------------------------------
+# TradeLog: simülatör çıktısı (struct-of-arrays)
+# -----------------------------------------------------------------------------
+EXIT_REASONS = (None, "tp", "sl", "force")   # reason kodu -> exit_reason
+_R_OPEN, _R_TP, _R_SL, _R_FORCE = 0, 1, 2, 3
+
+@dataclass
+class TradeLog:
+    """
+    Trade başına dict yerine NumPy kolonları. Stats doğrudan `pnl` dizisini kullanır;
+    JSON kayıtlar sadece API sınırında `to_records()` ile üretilir.
+    kind: "scheme" (simulate_scheme_over_entries) | "ordi" (walkforward_signals) kayıt formatı.
+    Açık işlem: exit_i = -1, exit_px = nan, reason = _R_OPEN.
+    """
+    index: pd.Index
+    entry_i: np.ndarray
+    exit_i: np.ndarray
+    entry_px: np.ndarray
+    exit_px: np.ndarray
+    side: np.ndarray
+    reason: np.ndarray
+    pnl: np.ndarray
+    tp_hit: np.ndarray
+    sl_hit: np.ndarray
+    kind: str = "scheme"
+    meta: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_lists(cls, index, entry_i, exit_i, entry_px, exit_px, side, reason, pnl, tp_hit, sl_hit,
+                   kind: str = "scheme", meta: Optional[Dict[str, Any]] = None) -> "TradeLog":
+        return cls(
+            index=index,
+            entry_i=np.asarray(entry_i, dtype=np.int64),
+            exit_i=np.asarray(exit_i, dtype=np.int64),
+            entry_px=np.asarray(entry_px, dtype=float),
+            exit_px=np.asarray(exit_px, dtype=float),
+            side=np.asarray(side, dtype=np.int8),
+            reason=np.asarray(reason, dtype=np.int8),
+            pnl=np.asarray(pnl, dtype=float),
+            tp_hit=np.asarray(tp_hit, dtype=bool),
+            sl_hit=np.asarray(sl_hit, dtype=bool),
+            kind=kind, meta=meta or {},
+        )
+
+    def __len__(self) -> int:
+        return int(self.pnl.size)
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    @property
+    def wins(self) -> int:
+        return int((self.pnl > 0).sum())
+
+    def _stamp(self, i: int):
+        ts = self.index[int(i)]
+        try:    return ts.isoformat()
+        except: return str(ts)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Eski dict formatı (JSON yanıtları için)."""
+        if self.kind == "ordi":
+            return self._ordi_records()
+        pp = (self.meta or {}).get("price_precision")
+        q = 10 ** int(pp) if pp is not None else None
+        rnd = (lambda px: round(float(px) * q) / q) if q is not None else float
+        out = []
+        for k in range(len(self)):
+            ei, xi, sgn = int(self.entry_i[k]), int(self.exit_i[k]), int(self.side[k])
+            tstamp = self._stamp(xi)
+            out.append({
+                "ts": tstamp, "time": tstamp,
+                "entry_ts": self._stamp(ei), "exit_ts": tstamp,
+                "side": "long" if sgn > 0 else "short",
+                "entry": rnd(self.entry_px[k]),
+                "exit":  rnd(self.exit_px[k]),
+                "price_precision": int(pp) if pp is not None else None,
+                "pnl": float(self.pnl[k]),
+                "exit_reason": EXIT_REASONS[int(self.reason[k])],
+                "tp_hit": bool(self.tp_hit[k]),
+                "sl_hit": bool(self.sl_hit[k]),
+                "entry_i": ei,
+            })
+        return out
+
+    def _ordi_records(self) -> List[Dict[str, Any]]:
+        meta = self.meta or {}
+        fees = round(float(meta.get("fees_bps_round", 0.0)), 2)
+        slip = round(float(meta.get("slip_bps_round", 0.0)), 2)
+        out = []
+        for k in range(len(self)):
+            ei, xi = int(self.entry_i[k]), int(self.exit_i[k])
+            rd = _round_digits_idx(ei)
+            closed = xi >= 0
+            out.append({
+                "time": str(self.index[ei]),
+                "side": "long" if self.side[k] > 0 else "short",
+                "entry_price": round(float(self.entry_px[k]), rd),
+                "exit_price": round(float(self.exit_px[k]), rd) if closed else None,
+                "exit_reason": EXIT_REASONS[int(self.reason[k])],
+                "t_exit": str(self.index[xi]) if closed else None,
+                "tp_hit": bool(self.tp_hit[k]),
+                "sl_hit": bool(self.sl_hit[k]),
+                "bar_index_entry": ei,
+                "bar_index_exit": xi if closed else None,
+                "pnl": round(float(self.pnl[k]), 6),
+                "fees_bps_round": fees,
+                "slip_bps_round": slip,
+                "funding_bps": None,
+            })
+        return out
+
+def _trade_pnl(trades) -> np.ndarray:
+    """TradeLog, pnl dizisi veya (eski) dict listesi -> pnl dizisi."""
+    if isinstance(trades, TradeLog):
+        return trades.pnl
+    if isinstance(trades, np.ndarray):
+        return trades.astype(float, copy=False)
+    return np.array([float(t.get("pnl", 0.0)) for t in (trades or [])], dtype=float)
+
+@dataclass
+class SparseEntries:
+    """
+    Seyrek giriş listesi: sıfırdan farklı sinyal barlarının sıralı indeksleri + yönleri.
+    Simülatörler flat iken bar bar yürümek yerine searchsorted ile sıradaki girişe atlar.
+    """
+    idx: np.ndarray   # int64, artan
+    sgn: np.ndarray   # int8, +1/-1
+
+    @classmethod
+    def from_signed(cls, signed) -> "SparseEntries":
+        e = np.sign(np.asarray(signed, dtype=float))
+        e = np.nan_to_num(e, nan=0.0)
+        idx = np.flatnonzero(e)
+        return cls(idx.astype(np.int64), e[idx].astype(np.int8))
+
+    @classmethod
+    def from_mask(cls, entries, sgn_series=None, side: int = 0) -> "SparseEntries":
+        """bool entries (+ opsiyonel işaret serisi) -> side filtresi uygulanmış seyrek liste."""
+        m = np.asarray(entries, dtype=bool)
+        if sgn_series is not None:
+            sg = np.nan_to_num(np.sign(np.asarray(sgn_series, dtype=float)), nan=0.0)
+            m = m & (sg != 0)
+        else:
+            sg = np.full(m.size, 1.0 if side > 0 else -1.0)
+        if side > 0:
+            m = m & (sg > 0)
+        elif side < 0:
+            m = m & (sg < 0)
+        idx = np.flatnonzero(m)
+        return cls(idx.astype(np.int64), sg[idx].astype(np.int8))
+
+    def __len__(self) -> int:
+        return int(self.idx.size)
+
+    def next_at(self, start: int) -> int:
+        """start (dahil) ve sonrasındaki ilk girişin listedeki sırası; yoksa len."""
+        return int(np.searchsorted(self.idx, start, side="left"))
+
+
+class BitMask:
+    """
+    Paketlenmiş bool maske: n bit, uint64 kelimeler (bool diziye göre 64x az bellek).
+    Bit i = kelime i // 64'ün (i % 64). biti (little-endian); son kelimenin artık bitleri hep 0.
+    &, | kelime kelime; count() popcount; indices() seyrekse sadece sıfır olmayan kelimeleri açar.
+    """
+    __slots__ = ("words", "n")
+
+    def __init__(self, words: np.ndarray, n: int):
+        self.words = words
+        self.n = int(n)
+
+    @classmethod
+    def from_bool(cls, m) -> "BitMask":
+        m = np.asarray(m, dtype=bool)
+        words = np.zeros((m.size + 63) >> 6, dtype=np.uint64)
+        packed = np.packbits(m, bitorder="little")
+        words.view(np.uint8)[:packed.size] = packed
+        return cls(words, m.size)
+
+    def to_bool(self) -> np.ndarray:
+        return np.unpackbits(self.words.view(np.uint8), count=self.n, bitorder="little").view(bool)
+
+    def __and__(self, other: "BitMask") -> "BitMask":
+        return BitMask(self.words & other.words, self.n)
+
+    def __or__(self, other: "BitMask") -> "BitMask":
+        return BitMask(self.words | other.words, self.n)
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.words.nbytes)
+
+    def count(self) -> int:
+        if hasattr(np, "bitwise_count"):  # numpy >= 2
+            return int(np.bitwise_count(self.words).sum())
+        return int(np.count_nonzero(np.unpackbits(self.words.view(np.uint8))))
+
+    def indices(self) -> np.ndarray:
+        """Set bitlerin artan int64 indeksleri."""
+        nz = np.flatnonzero(self.words)
+        if nz.size * 8 > self.words.size:  # yoğun: tamamını açmak daha ucuz
+            return np.flatnonzero(self.to_bool()).astype(np.int64, copy=False)
+        f = np.flatnonzero(np.unpackbits(self.words[nz].view(np.uint8), bitorder="little"))
+        return nz[f >> 6].astype(np.int64) * 64 + (f & 63)
+
+
+def _first_cross(high: np.ndarray, low: np.ndarray, start: int, upper: float, lower: float) -> int:
+    """
+    start'tan itibaren high >= upper veya low <= lower olan ilk bar; yoksa -1.
+    Büyüyen bloklarla tarar: maliyet tutma süresiyle orantılı, toplam bar sayısıyla değil.
+    """
+    n = high.size
+    j, step = start, 64
+    while j < n:
+        k = min(n, j + step)
+        hit = np.flatnonzero((high[j:k] >= upper) | (low[j:k] <= lower))
+        if hit.size:
+            return j + int(hit[0])
+        j, step = k, step * 4
+    return -1
+
+
+def resolve_cost_bps(maker_bps, taker_bps, slip_bps) -> Optional[tuple]:
+    """bps profili verilmişse (taker, slip) — eksikler ACTIVE_COSTS_CONFIG'ten; hiçbiri yoksa None (legacy %)."""
+    if maker_bps is None and taker_bps is None and slip_bps is None:
+        return None
+    return (float(taker_bps) if taker_bps is not None else float(ACTIVE_COSTS_CONFIG.get("taker_bps", 5.0)),
+            float(slip_bps) if slip_bps is not None else float(ACTIVE_COSTS_CONFIG.get("slip_bps", 8.0)))
+
+def walkforward_signals(df: pd.DataFrame, entries_signed: pd.Series, cfg: RunConfig) -> TradeLog:
+    # TradeLog kolonları (trade başına dict yok)
+    ent_i, ex_i, ent_px, ex_px, sides, reasons, pnls, tph, slh = ([] for _ in range(9))
     e = entries_signed.astype(int).values
     idx = df.index
     close = df["close"].to_numpy()
@@ -1327,9 +1580,9 @@ def walkforward_signals(df: pd.DataFrame, entries_signed: pd.Series, cfg: RunCon
     n = len(df)
     # maliyet çözümlemesi:
     # - eğer maker/taker/slip bps verilmişse onları kullan (taker default), yoksa legacy % round-trip
-    if (cfg.maker_bps is not None) or (cfg.taker_bps is not None) or (cfg.slip_bps is not None):
-        taker_bps = cfg.taker_bps if cfg.taker_bps is not None else float(ACTIVE_COSTS_CONFIG.get("taker_bps", 5.0))
-        slip_side_bps = cfg.slip_bps if cfg.slip_bps is not None else float(ACTIVE_COSTS_CONFIG.get("slip_bps", 8.0))
+    bps = resolve_cost_bps(cfg.maker_bps, cfg.taker_bps, cfg.slip_bps)
+    if bps is not None:
+        taker_bps, slip_side_bps = bps
         fee  = (2.0 * taker_bps) / 10000.0          # round-trip fee (%)
         slip = (2.0 * slip_side_bps) / 10000.0      # round-trip slip (%)
     else:
@@ -1344,120 +1597,159 @@ def walkforward_signals(df: pd.DataFrame, entries_signed: pd.Series, cfg: RunCon
 
    
 
-    i = 0
-    while i < n:
-        if e[i] == 0:
-            i += 1
-            continue
-        side = int(np.sign(e[i]))
-        if side == 0:
-            i += 1
-            continue
-
+    sp = SparseEntries.from_signed(e)
+    k = 0
+    while k < len(sp):
+        i = int(sp.idx[k]); side = int(sp.sgn[k])
         rd = _round_digits_idx(i)
-        entry_idx = i
         entry_price = float(close[i])
 
         if side > 0:
             tp_price = round(entry_price * (1 + cfg.tp), rd)
             sl_price = round(entry_price * (1 - cfg.sl), rd)
+            upper, lower = tp_price, sl_price
         else:
             tp_price = round(entry_price * (1 - cfg.tp), rd)
             sl_price = round(entry_price * (1 + cfg.sl), rd)
+            upper, lower = sl_price, tp_price
 
-        # varsayÄ±lanlar (aÃ§Ä±k iÅŸlem)
-        exit_idx: Optional[int] = None
-        exit_price: Optional[float] = None
-        exit_reason: Optional[str] = None
-        tp_hit = False
-        sl_hit = False
-        closed = False
-
-        # giriÅŸten sonra barlarda TP/SL ara
-        for j in range(i+1, n):
-            hi = float(high[j]); lo = float(low[j])
-            if side > 0:
-                sl_bar = (lo <= sl_price)
-                tp_bar = (hi >= tp_price)
-                if sl_bar or tp_bar:
-                    if sl_bar:
-                        exit_reason = "sl"; exit_price = sl_price; sl_hit = True
-                    else:
-                        exit_reason = "tp"; exit_price = tp_price; tp_hit = True
-                    closed = True
-                    exit_idx = j
-                    i = j  # Ã§Ä±kÄ±ÅŸ barÄ±na atla (re-entry aynÄ± barda mÃ¼mkÃ¼n olsun)
-                    break
-            else:
-                sl_bar = (hi >= sl_price)
-                tp_bar = (lo <= tp_price)
-                if sl_bar or tp_bar:
-                    if sl_bar:
-                        exit_reason = "sl"; exit_price = sl_price; sl_hit = True
-                    else:
-                        exit_reason = "tp"; exit_price = tp_price; tp_hit = True
-                    closed = True
-                    exit_idx = j
-                    i = j
-                    break
-        
+        # girişten sonra barlarda TP/SL ara (aynı barda ikisi de varsa SL öncelikli)
+        j = _first_cross(high, low, i + 1, upper, lower)
 
-        if closed:
-            # gerÃ§ekleÅŸen kapanÄ±ÅŸta PnL
+        if j >= 0:
+            sl_hit = bool(low[j] <= sl_price) if side > 0 else bool(high[j] >= sl_price)
+            tp_hit = not sl_hit
+            exit_price = sl_price if sl_hit else tp_price
             if side > 0:
                 raw_ret = (exit_price - entry_price) / entry_price
             else:
                 raw_ret = (entry_price - exit_price) / entry_price
             pnl = (raw_ret * cfg.leverage) - (fee + slip)
-            
-            signals.append({
-                "time": str(idx[entry_idx]),
-                "side": "long" if side > 0 else "short",
-                "entry_price": round(entry_price, rd),
-                "exit_price": round(float(exit_price), rd),
-                "exit_reason": exit_reason,
-                "t_exit": str(idx[i]),          # â†  Ã‡IKIÅž ZAMANINI EKLE
-                "tp_hit": bool(tp_hit),
-                "sl_hit": bool(sl_hit),
-                "bar_index_entry": int(entry_idx),
-                "bar_index_exit": int(i),
-                "pnl": round(float(pnl), 6),
-                "fees_bps_round": round(float(fees_bps_round), 2),
-                "slip_bps_round": round(float(slip_bps_round), 2),
-                "funding_bps": None,
 
-            })
+            ent_i.append(i); ex_i.append(j)
+            ent_px.append(entry_price); ex_px.append(exit_price)
+            sides.append(side); reasons.append(_R_SL if sl_hit else _R_TP)
+            pnls.append(pnl); tph.append(tp_hit); slh.append(sl_hit)
+            k = sp.next_at(j)  # çıkış barına atla (re-entry aynı barda mümkün)
+        else:
+            # açık işlem kaydı: TP/SL tik yok, PnL=0, çıkış zamanı yok
+            ent_i.append(i); ex_i.append(-1)
+            ent_px.append(entry_price); ex_px.append(np.nan)
+            sides.append(side); reasons.append(_R_OPEN)
+            pnls.append(0.0); tph.append(False); slh.append(False)
+            k += 1
+
+    return TradeLog.from_lists(
+        idx, ent_i, ex_i, ent_px, ex_px, sides, reasons, pnls, tph, slh, kind="ordi",
+        meta={"fees_bps_round": fees_bps_round, "slip_bps_round": slip_bps_round},
+    )
 
-        
-            # i ÅŸu anda exit_idx; bir sonraki iterasyonda tekrar kontrol edilir (re-entry olabilir)
+
+# -----------------------------------------------------------------------------
+# Fused trade statistics kernel
+# -----------------------------------------------------------------------------
+def trade_stats_kernel(pnl, offsets=None) -> Dict[str, np.ndarray]:
+    """
+    Tüm stats fonksiyonlarının ortak çekirdeği: pnl dizisi üzerinden tek geçişte
+    sayımlar, toplamlar, bileşik/toplamsal equity, drawdown, sharpe, pf, expectancy.
+
+    pnl     : tek aday için 1-D dizi, ya da ragged batch için düz (concat) dizi
+    offsets : batch sınırları (len = n_cand + 1, offsets[0] = 0); None -> tek aday
+    Dönüş   : {metrik -> (n_cand,) dizi}
+      profit/maxDD      : bileşik equity (cumprod(1+pnl)) üzerinden, %
+      maxDD_add         : toplamsal equity (cumsum(pnl)) üzerinden, %
+      sharpe/sharpe_pop : ddof=1 / ddof=0 std ile, sqrt(N) ölçekli
+      expectancy        : trade başına beklenen pnl (= ortalama)
+    """
+    x = np.asarray(pnl, dtype=float).ravel()
+    if offsets is None:
+        offsets = np.array([0, x.size], dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = np.diff(offsets)
+    k = n.size
+    nz = np.maximum(n, 1)
+
+    live = n > 0
+
+    def _segsum(v):
+        # segment başına ayrı toplam (cumsum farkı büyük batch'lerde hassasiyet kaybeder)
+        out = np.zeros(k)
+        if live.any():
+            out[live] = np.add.reduceat(np.asarray(v, dtype=float), offsets[:-1][live])
+        return out
+
+    win = x > 0
+    wins = _segsum(win).round().astype(np.int64)
+    total = _segsum(x)
+    gains = _segsum(np.where(win, x, 0.0))
+    losses_abs = _segsum(np.where(win, 0.0, -x))
+    mean = np.where(n > 0, total / nz, 0.0)
+    dev2 = (x - np.repeat(mean, n)) ** 2
+    ss = _segsum(dev2)
+    std = np.where(n > 1, np.sqrt(ss / np.maximum(n - 1, 1)), 0.0)
+    std_pop = np.where(n > 1, np.sqrt(ss / nz), 0.0)
+
+    # equity eğrileri (bileşik + toplamsal) ve drawdown
+    if k == 1:
+        eq_m = np.cumprod(1.0 + x); eq_a = np.cumsum(x)
+        if x.size:
+            equity = eq_m[-1:]
+            dd_m = np.array([(eq_m / np.maximum.accumulate(eq_m) - 1.0).min()])
+            dd_a = np.array([(eq_a - np.maximum.accumulate(eq_a)).min()])
         else:
-            # aÃ§Ä±k iÅŸlem kaydÄ±: TP/SL tik yok, PnL=0, Ã§Ä±kÄ±ÅŸ zamanÄ± yok
-            signals.append({
-                "time": str(idx[entry_idx]),
-                "side": "long" if side > 0 else "short",
-                "entry_price": round(entry_price, rd),
-                "exit_price": None,
-                "exit_reason": None,
-                "t_exit": None,
-                "tp_hit": False,
-                "sl_hit": False,
-                "bar_index_entry": int(entry_idx),
-                "bar_index_exit": None,
-                "pnl": 0.0,
-                "fees_bps_round": round(float(fees_bps_round), 2),
-                "slip_bps_round": round(float(slip_bps_round), 2),
-                "funding_bps": None,
-            })
-            i += 1  # veri sonuna kadar kapatmadÄ±ysak bir bar ilerle
+            equity, dd_m, dd_a = np.ones(1), np.zeros(1), np.zeros(1)
+    else:
+        seg = np.repeat(np.arange(k), n)
+        s = pd.Series(1.0 + x)
+        eq_m = s.groupby(seg).cumprod()
+        eq_a = pd.Series(x).groupby(seg).cumsum()
+        dd_m = (eq_m / eq_m.groupby(seg).cummax() - 1.0).groupby(seg).min().reindex(range(k), fill_value=0.0).to_numpy()
+        dd_a = (eq_a - eq_a.groupby(seg).cummax()).groupby(seg).min().reindex(range(k), fill_value=0.0).to_numpy()
+        equity = eq_m.groupby(seg).last().reindex(range(k), fill_value=1.0).to_numpy()
+
+    sq = np.sqrt(nz)
+    return {
+        "trades": n, "wins": wins, "losses": n - wins,
+        "sum": total, "mean": mean, "expectancy": mean,
+        "std": std, "std_pop": std_pop,
+        "gains": gains, "losses_abs": losses_abs,
+        "equity": equity,
+        "profit": (equity - 1.0) * 100.0,
+        "maxDD": dd_m * 100.0,
+        "maxDD_add": dd_a * 100.0,
+        "sharpe": (mean / (std + 1e-12)) * sq,
+        "sharpe_pop": (mean / (std_pop + 1e-12)) * sq,
+        "pf": gains / (losses_abs + 1e-12),
+        "winRate": np.where(n > 0, wins / nz * 100.0, 0.0),
+    }
+
+def _kernel_row(kern: Dict[str, np.ndarray], i: int = 0) -> Dict[str, float]:
+    return {k: (int(v[i]) if v.dtype.kind in "iu" else float(v[i])) for k, v in kern.items()}
 
-    return signals
+def stats_from_trades_batch(trade_logs) -> List[Dict[str, float]]:
+    """Optimizer batch'i: aday başına TradeLog/pnl -> stats_from_trades_basic formatında liste."""
+    pnls = [_trade_pnl(t) for t in trade_logs]
+    if not pnls:
+        return []
+    offsets = np.concatenate(([0], np.cumsum([p.size for p in pnls])))
+    kern = trade_stats_kernel(np.concatenate(pnls) if offsets[-1] else np.zeros(0), offsets)
+    return [_basic_from_kernel(_kernel_row(kern, i)) for i in range(len(pnls))]
 
+def _basic_from_kernel(r: Dict[str, float]) -> Dict[str, float]:
+    if not r["trades"]:
+        return {"profit": 0.0, "winRate": 0.0, "trades": 0, "wins": 0, "losses": 0, "sharpe": 0.0, "maxDD": 0.0, "pf": 0.0}
+    return {"profit": r["profit"], "winRate": r["winRate"], "trades": r["trades"], "wins": r["wins"],
+            "losses": r["losses"], "sharpe": r["sharpe"], "maxDD": r["maxDD"], "pf": r["pf"]}
 
-def stats_from_signals_ordi(signals: List[Dict[str, Any]], tp: float, sl: float, leverage: float) -> Dict[str, float]:
+def stats_from_signals_ordi(signals, tp: float, sl: float, leverage: float) -> Dict[str, float]:
     if not signals:
         return {"profit": 0.0, "winRate": 0.0, "trades": 0, "wins": 0, "losses": 0, "sharpe": 0.0, "maxDD": 0.0, "pf": 0.0}
-    wins = sum(1 for s in signals if s["exit_reason"] == "tp")
-    losses = sum(1 for s in signals if s["exit_reason"] == "sl")
+    if isinstance(signals, TradeLog):
+        wins = int((signals.reason == _R_TP).sum())
+        losses = int((signals.reason == _R_SL).sum())
+    else:
+        wins = sum(1 for s in signals if s["exit_reason"] == "tp")
+        losses = sum(1 for s in signals if s["exit_reason"] == "sl")
     trades = wins + losses
 
     win_mult  = 0.998 + (tp * leverage)
@@ -1465,23 +1757,10 @@ def stats_from_signals_ordi(signals: List[Dict[str, Any]], tp: float, sl: float,
     total_profit = (win_mult ** wins) * (loss_mult ** losses) - 1.0
     profit_pct = float(total_profit * 100.0)
 
-    ret = np.array([float(s["pnl"]) for s in signals], dtype=float)
-    std = float(ret.std(ddof=0)) if ret.size > 1 else 0.0
-    mean = float(ret.mean()) if ret.size else 0.0
-    sharpe = (mean / (std + 1e-12)) * np.sqrt(max(ret.size, 1))
-
-    eq = ret.cumsum()
-    peak = np.maximum.accumulate(eq)
-    dd = (eq - peak)
-    maxDD = float(dd.min() * 100.0)
-
-    gains = float(ret[ret > 0].sum())
-    losses_abs = float(-ret[ret <= 0].sum())
-    pf = gains / (losses_abs + 1e-12)
-
+    k = _kernel_row(trade_stats_kernel(_trade_pnl(signals)))
     winRate = (wins / trades * 100.0) if trades else 0.0
     return {"profit": profit_pct, "winRate": winRate, "trades": int(trades), "wins": int(wins),
-            "losses": int(losses), "sharpe": float(sharpe), "maxDD": float(maxDD), "pf": float(pf)}
+            "losses": int(losses), "sharpe": k["sharpe_pop"], "maxDD": k["maxDD_add"], "pf": k["pf"]}
 
 # -----------------------------------------------------------------------------
 # Vectorized backtest core (Adım-1)
@@ -1517,7 +1796,7 @@ class BacktestRunReqPlusBase(BaseModel):
     timeframe: str
     start: str
     end: str
-    expr: str
+    expr: Union[str, List[str], Dict[str, str]]  # çoklu strateji: list/dict
     side: int = 1
     indicators: Dict[str, Any] = {}
     params: Dict[str, Any] = {}
@@ -1525,6 +1804,8 @@ class BacktestRunReqPlusBase(BaseModel):
     fee_pct: float = 0.0
     slippage_pct: float = 0.0
     mode: Optional[str] = None  # "vectorized" | "event" (UI'dan bilgi amaçlı)
+    prefer: Optional[str] = "skip"               # çoklu strateji çakışması: skip|long|short|priority
+    priorities: Optional[Dict[str, int]] = None  # {strateji adı: öncelik} (küçük sayı üstün)
 
 
     exit_scheme: Optional[ExitSchemeEvt] = None
@@ -1944,14 +2225,29 @@ def _series_to_intent(raw: pd.Series, side: int, respect_expr_sign: bool) -> pd.
     return s                                    # both: {-1,0,1}
 
 
-def _eval_one(df_slice: pd.DataFrame, req: WFOReq, cand_params: dict):
+def _eval_one(df_slice: pd.DataFrame, req: WFOReq, cand_params: dict, data_fp: Optional[str] = None):
     """
     Tek dilimde koş: indikatörleri üret → expr'ü çalıştır → intent → walkforward_signals → stats.
     Not: Senin akışınla aynı: compute_indicators → eval_expr → _series_to_intent → walkforward_signals → stats_from_signals_ordi
+    data_fp verilirse stats EVAL_CACHE'ten okunur/yazılır (cache isabetinde signals=None).
     """
     if df_slice is None or len(df_slice) == 0:
         return {"stats": {"profit": 0, "winRate": 0, "trades": 0}, "signals": []}
 
+    ekey = None
+    if data_fp is not None:
+        ekey = eval_cache_key(
+            kind="ordi", data=data_fp, timeframe=req.timeframe, expr=req.expr,
+            params={**(req.params or {}), **(cand_params or {})}, indicators=req.indicators or {},
+            side=req.side, respect_expr_sign=req.respect_expr_sign, tp=req.tp, sl=req.sl,
+            leverage=req.leverage, fee_pct=req.fee_pct, slippage_pct=req.slippage_pct,
+            maker_bps=req.maker_bps, taker_bps=req.taker_bps, slip_bps=req.slip_bps,
+            cost_bps=resolve_cost_bps(req.maker_bps, req.taker_bps, req.slip_bps), version=EVAL_CACHE_VERSION,
+        )
+        hit = EVAL_CACHE.get(ekey)
+        if hit is not None:
+            return {"stats": hit, "signals": None}
+
     dfi = compute_indicators(df_slice, timeframe=req.timeframe, **(req.indicators or {}))
     raw = eval_expr(dfi, req.expr, {**(req.params or {}), **(cand_params or {})})
     entries = _series_to_intent(raw, side=req.side, respect_expr_sign=req.respect_expr_sign)  # :contentReference[oaicite:4]{index=4}
@@ -1968,6 +2264,8 @@ def _eval_one(df_slice: pd.DataFrame, req: WFOReq, cand_params: dict):
         stats = stats_from_signals_ordi(signals, cfg.tp, cfg.sl, cfg.leverage)
     except TypeError:
         stats = stats_from_signals_ordi(signals)      # :contentReference[oaicite:6]{index=6}
+    if ekey is not None:
+        EVAL_CACHE.put(ekey, stats)
     return {"stats": stats, "signals": signals}
 
 
@@ -2036,6 +2334,7 @@ def optimize_wfo(req: WFOReq):
         # purge
         if req.purge_bars > 0:
             tr = tr.iloc[: max(0, len(tr) - req.purge_bars)]
+        fp_tr, fp_te = df_fingerprint(tr), df_fingerprint(te)
 
         # === 2) TRAIN: en iyi adayı seç ===
         # Seçenek A) Sadece grid: cand_params = arg max
@@ -2045,7 +2344,7 @@ def optimize_wfo(req: WFOReq):
 
         # “Basit grid tarama” (her zaman var)
         for cand in grid:
-            res_tr = _eval_one(tr, req, cand)
+            res_tr = _eval_one(tr, req, cand, fp_tr)
             obj_tr = _compute_objective(res_tr["stats"], req.objective)
             if (res_tr["stats"].get("trades", 0) or 0) < req.min_trades:
                 continue
@@ -2065,7 +2364,7 @@ def optimize_wfo(req: WFOReq):
             # payload içinde "params" varsa al
             for sc, _misc, payload in (heap or []):
                 cand = payload.get("params") or {}
-                res_tr = _eval_one(tr, req, cand)
+                res_tr = _eval_one(tr, req, cand, fp_tr)
                 obj_tr = _compute_objective(res_tr["stats"], req.objective)
                 if (res_tr["stats"].get("trades", 0) or 0) < req.min_trades:
                     continue
@@ -2087,7 +2386,7 @@ def optimize_wfo(req: WFOReq):
             continue
 
         # === 3) TEST: seçilen param ile değerlendir ===
-        res_te = _eval_one(te, req, best["params"])
+        res_te = _eval_one(te, req, best["params"], fp_te)
         obj_te = _compute_objective(res_te["stats"], req.objective)
 
         out_folds.append({
@@ -2116,6 +2415,7 @@ def optimize_wfo(req: WFOReq):
         "avg_winRate":  float(np.mean(agg_wr)) if agg_wr else 0.0,
         "sum_trades":   int(np.sum(agg_trades)) if agg_trades else 0,
     }
+    EVAL_CACHE.flush()
     return {"summary": summary, "folds": out_folds}
 @app.get("/indicators/catalog")
 def indicators_catalog():
@@ -2480,6 +2780,408 @@ def random_space(opt: Dict[str, Any], samples: int):
 def _camelize_stats_row(row: Dict[str, Any]) -> Dict[str, Any]:
     m = {"win_rate":"winRate","max_dd":"maxDD","profit_factor":"pf"}
     return {m.get(k,k): v for k,v in row.items()}
+
+# ---- parallel evaluation (process pool)
+# Worker'lar fork ile açılır: ctx (df, numpy dizileri...) pickle edilmeden miras alınır.
+OPT_WORKERS = int(os.environ.get("OPT_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+_POOL_CTX: Dict[str, Any] = {}
+
+def _pool_init(ctx: Dict[str, Any]) -> None:
+    global _POOL_CTX
+    _POOL_CTX = ctx
+
+def _pool_call(fn, item):
+    return fn(_POOL_CTX, item)
+
+def _mp_context():
+    import multiprocessing as mp
+    try:
+        return mp.get_context("fork")
+    except ValueError:
+        return mp.get_context()
+
+def _resolve_jobs(n_jobs: Optional[int], n_items: int) -> int:
+    n = int(n_jobs) if n_jobs else OPT_WORKERS
+    return max(1, min(n, n_items))
+
+def _map_ordered(fn, items, ctx: Dict[str, Any], n_jobs: Optional[int] = None, stop=None) -> List[Any]:
+    """
+    fn(ctx, item) her öğe için çalışır; sonuçlar girdi sırasıyla döner.
+    stop(result) True dönerse o sonuçta durulur ve bekleyen işler iptal edilir.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    items = list(items)
+    out: List[Any] = []
+    jobs = _resolve_jobs(n_jobs, len(items))
+    if jobs > 1:
+        ex = ProcessPoolExecutor(max_workers=jobs, mp_context=_mp_context(),
+                                 initializer=_pool_init, initargs=(ctx,))
+        try:
+            futs = [ex.submit(_pool_call, fn, it) for it in items]
+            for f in futs:
+                r = f.result()
+                out.append(r)
+                if stop is not None and stop(r):
+                    break
+            return out
+        except BrokenProcessPool:
+            out = []  # havuz kullanılamıyor -> seri çalış
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+    for it in items:
+        r = fn(ctx, it)
+        out.append(r)
+        if stop is not None and stop(r):
+            break
+    return out
+
+class WorkerPool:
+    """
+    Batch'ler arasında yaşayan process havuzu (ask/tell döngüleri, GA nesilleri için).
+    ctx bir kez fork ile aktarılır; jobs<=1 ya da havuz bozulursa seri çalışır.
+    """
+    def __init__(self, ctx: Dict[str, Any], n_jobs: Optional[int] = None):
+        self.ctx = ctx
+        self.jobs = _resolve_jobs(n_jobs, 1 << 30)
+        self._ex = None
+
+    def map(self, fn, items) -> List[Any]:
+        items = list(items)
+        if self.jobs > 1 and len(items) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            from concurrent.futures.process import BrokenProcessPool
+            try:
+                if self._ex is None:
+                    self._ex = ProcessPoolExecutor(max_workers=self.jobs, mp_context=_mp_context(),
+                                                   initializer=_pool_init, initargs=(self.ctx,))
+                return [f.result() for f in [self._ex.submit(_pool_call, fn, it) for it in items]]
+            except BrokenProcessPool:
+                self.close()
+                self.jobs = 1
+        return [fn(self.ctx, it) for it in items]
+
+    def close(self) -> None:
+        if self._ex is not None:
+            self._ex.shutdown(wait=False, cancel_futures=True)
+            self._ex = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ---- persistent evaluation cache (cross-request)
+# Anahtar: (snapshot içeriği, expr, indikatörler, paramlar, exit şeması, maliyetler) içerik hash'i.
+# Değer: kompakt stats (trade listesi tutulmaz). SQLite dosyası + süreç içi LRU; boyut sınırlı.
+EVAL_CACHE_PATH = os.environ.get("EVAL_CACHE_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "eval_cache.sqlite")))
+EVAL_CACHE_MAX = int(os.environ.get("EVAL_CACHE_MAX", "200000") or 0)
+# Simülatör (walkforward_signals, simulate_scheme_over_entries) ya da stats çekirdeği sonucu
+# değiştirdiğinde artırın: anahtarlara girer, eski kalıcı sonuçlar kullanılmaz.
+EVAL_CACHE_VERSION = 4
+
+def _jsonable(o):
+    if isinstance(o, BaseModel):
+        return o.dict()
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+def df_fingerprint(df: pd.DataFrame) -> str:
+    """DataFrame içerik hash'i (index + kolonlar + değerler)."""
+    import hashlib
+    h = hashlib.sha1()
+    h.update(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def snapshot_fingerprint(sid: str) -> str:
+    meta = SNAPSHOT_STORE[sid].setdefault("meta", {})
+    if "fingerprint" not in meta:
+        meta["fingerprint"] = df_fingerprint(SNAPSHOT_STORE[sid]["df"])
+    return meta["fingerprint"]
+
+def eval_cache_key(**parts) -> str:
+    import hashlib
+    blob = json.dumps(parts, sort_keys=True, default=_jsonable, separators=(",", ":"))
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+class EvalResultCache:
+    """
+    Boyut sınırlı kalıcı sonuç deposu. get/put stats dict'leri saklar;
+    max_entries aşılınca en eski erişilenler silinir. path=None -> sadece bellek.
+    Yazımlar (yeni satırlar + disk isabetlerinin ts güncellemesi) bellekte biriktirilir ve
+    _flush'ta tek transaction'da yazılıp hemen commit edilir: bağlantı yazma kilidini tutmaz.
+    """
+    def __init__(self, path: Optional[str], max_entries: int = 200000, mem_entries: int = 50000):
+        import threading
+        from collections import OrderedDict
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.mem_entries = int(mem_entries)
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._rows: Dict[str, tuple] = {}     # k -> (v json, ts), henüz yazılmadı
+        self._touched: Dict[str, float] = {}  # disk isabetleri: k -> ts
+
+    def _conn(self):
+        # fork edilen worker'lar bağlantıyı paylaşmasın
+        if self.path and (self._db is None or self._pid != os.getpid()):
+            import sqlite3
+            try:
+                self._db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("CREATE TABLE IF NOT EXISTS eval (k TEXT PRIMARY KEY, v TEXT, ts REAL)")
+                self._pid = os.getpid()
+            except Exception as e:
+                print(f"[eval-cache] disk devre dışı: {e}")
+                self.path, self._db = None, None
+        return self._db
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            v = self._mem.get(key)
+            if v is not None:
+                self._mem.move_to_end(key)
+                return v
+            db = self._conn()
+            if db is None:
+                return None
+            row = db.execute("SELECT v FROM eval WHERE k=?", (key,)).fetchone()
+            if row is None:
+                return None
+            v = json.loads(row[0])
+            self._touched[key] = time.time()
+            self._remember(key, v)
+            self._maybe_flush()
+            return v
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if not self.path:
+                return
+            try:
+                self._rows[key] = (json.dumps(value, default=_jsonable), time.time())
+            except Exception as e:
+                print(f"[eval-cache] serileştirilemedi: {e}")
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self._rows) + len(self._touched) >= 1000:
+            try:
+                self._flush()
+            except Exception as e:
+                print(f"[eval-cache] yazılamadı: {e}")
+
+    def _remember(self, key, value):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_entries:
+            self._mem.popitem(last=False)
+
+    def _flush(self):
+        db = self._conn()
+        if db is None:
+            return
+        rows, touched = self._rows, self._touched
+        self._rows, self._touched = {}, {}
+        with db:  # tek transaction; çıkışta commit (hata -> rollback)
+            db.executemany("INSERT OR REPLACE INTO eval (k, v, ts) VALUES (?, ?, ?)",
+                           [(k, v, ts) for k, (v, ts) in rows.items()])
+            db.executemany("UPDATE eval SET ts=? WHERE k=?", [(ts, k) for k, ts in touched.items()])
+        if self.max_entries > 0:
+            n = db.execute("SELECT COUNT(*) FROM eval").fetchone()[0]
+            if n > self.max_entries:
+                db.execute("DELETE FROM eval WHERE k IN (SELECT k FROM eval ORDER BY ts ASC LIMIT ?)",
+                           (n - self.max_entries,))
+                db.commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            try:
+                self._flush()
+            except Exception as e:
+                print(f"[eval-cache] flush hatası: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._rows.clear()
+            self._touched.clear()
+            db = self._conn()
+            if db is not None:
+                db.execute("DELETE FROM eval")
+                db.commit()
+
+EVAL_CACHE = EvalResultCache(EVAL_CACHE_PATH if EVAL_CACHE_MAX > 0 else None, max_entries=EVAL_CACHE_MAX)
+
+# WARM_START_PATH="" -> warm start sadece bellekte (EVAL_CACHE_MAX'tan bağımsız)
+WARM_START_PATH = os.environ.get("WARM_START_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "warm_start.sqlite")))
+
+def strategy_fingerprint(kind: str, **parts) -> str:
+    """Veri aralığından ve sınırlardan bağımsız strateji kimliği (warm start eşleşmesi için)."""
+    return f"{kind}-{eval_cache_key(**parts)[:16]}"
+
+class WarmStartStore:
+    """
+    Strateji parmak izi başına önceki koşuların en iyi sonuçları (parametre dict'i, GP ağacı, ...).
+    Her parmak izi için skoru en yüksek keep kayıt tutulur; path yazılamazsa sadece bellek.
+    """
+    def __init__(self, path: Optional[str], keep: int = 50):
+        import threading
+        self.path = path
+        self.keep = int(keep)
+        self._mem: Dict[str, Dict[str, tuple]] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _conn(self):
+        if self.path and (self._db is None or self._pid != os.getpid()):
+            import sqlite3
+            try:
+                self._db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("CREATE TABLE IF NOT EXISTS warm (fp TEXT, item TEXT, score REAL, ts REAL, "
+                                 "PRIMARY KEY (fp, item))")
+                self._pid = os.getpid()
+            except Exception as e:
+                print(f"[warm-start] disk devre dışı: {e}")
+                self.path, self._db = None, None
+        return self._db
+
+    def record(self, fingerprint: str, scored_items: List[tuple]) -> None:
+        """scored_items: [(score, item), ...]; aynı item tekrar gelirse son skor geçerli."""
+        rows = [(fingerprint, json.dumps(it, sort_keys=True, default=_jsonable), float(sc), time.time())
+                for sc, it in scored_items if sc is not None and math.isfinite(float(sc))]
+        if not rows:
+            return
+        with self._lock:
+            mem = self._mem.setdefault(fingerprint, {})
+            for _, it, sc, ts in rows:
+                mem[it] = (sc, ts)
+            for it, _ in sorted(mem.items(), key=lambda kv: kv[1], reverse=True)[self.keep:]:
+                del mem[it]
+            db = self._conn()
+            if db is None:
+                return
+            try:
+                db.executemany("INSERT OR REPLACE INTO warm (fp, item, score, ts) VALUES (?, ?, ?, ?)", rows)
+                db.execute("DELETE FROM warm WHERE fp=? AND item NOT IN "
+                           "(SELECT item FROM warm WHERE fp=? ORDER BY score DESC, ts DESC LIMIT ?)",
+                           (fingerprint, fingerprint, self.keep))
+                db.commit()
+            except Exception as e:
+                print(f"[warm-start] yazılamadı: {e}")
+
+    def best(self, fingerprint: str, n: int = 10) -> List[Any]:
+        with self._lock:
+            db = self._conn()
+            if db is not None:
+                rows = db.execute("SELECT item FROM warm WHERE fp=? ORDER BY score DESC, ts DESC LIMIT ?",
+                                  (fingerprint, int(n))).fetchall()
+                return [json.loads(r[0]) for r in rows]
+            mem = self._mem.get(fingerprint, {})
+            return [json.loads(it) for it, _ in sorted(mem.items(), key=lambda kv: kv[1], reverse=True)[:int(n)]]
+
+    def clear(self, fingerprint: Optional[str] = None) -> None:
+        with self._lock:
+            if fingerprint is None:
+                self._mem.clear()
+            else:
+                self._mem.pop(fingerprint, None)
+            db = self._conn()
+            if db is not None:
+                if fingerprint is None:
+                    db.execute("DELETE FROM warm")
+                else:
+                    db.execute("DELETE FROM warm WHERE fp=?", (fingerprint,))
+                db.commit()
+
+WARM_START = WarmStartStore(WARM_START_PATH or None)
+
+class TopKCollector:
+    """
+    Sabit bellekli sonuç toplayıcı: objective'e göre min-heap'te en iyi k aday
+    (+ opsiyonel reservoir örneklem, yüzey grafikleri için).
+    Eşit skorda önce gelen korunur (stable sort ile aynı sıra).
+    """
+    def __init__(self, k: int = 200, reservoir: int = 0, seed: Optional[int] = None):
+        self.k = max(1, int(k))
+        self.reservoir = max(0, int(reservoir))
+        self.seen = 0
+        self._heap: List[tuple] = []
+        self._keys: Dict[Any, tuple] = {}
+        self._sample: List[Any] = []
+        self._rng = random.Random(seed)
+
+    def push(self, score: float, item: Any, key: Any = None) -> None:
+        self.seen += 1
+        if self.reservoir:
+            if len(self._sample) < self.reservoir:
+                self._sample.append(item)
+            else:
+                j = self._rng.randrange(self.seen)
+                if j < self.reservoir:
+                    self._sample[j] = item
+        if key is not None and key in self._keys:
+            return  # aynı aday zaten top-k içinde
+        score = float(score) if score == score else -np.inf  # NaN en sona
+        entry = (score, -self.seen, key, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            old = heapq.heappushpop(self._heap, entry)
+            self._keys.pop(old[2], None)
+        else:
+            return
+        if key is not None:
+            self._keys[key] = entry
+
+    def items(self) -> List[Any]:
+        return [e[3] for e in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def sample(self) -> List[Any]:
+        return list(self._sample)
+
+
+class BudgetExhausted(Exception):
+    """Zaman/değerlendirme bütçesi bitti; çağıran en iyi-şimdiye-kadar sonucu döner."""
+
+class EvalBudget:
+    """max_seconds / max_evals bütçesi (None = sınırsız). Değerlendirme döngüleri check() çağırır."""
+    def __init__(self, max_seconds: Optional[float] = None, max_evals: Optional[int] = None,
+                 t0: Optional[float] = None):
+        self.max_seconds = float(max_seconds) if max_seconds else None
+        self.max_evals = int(max_evals) if max_evals else None
+        self.t0 = t0 if t0 is not None else time.time()
+        self.hit = False
+
+    @classmethod
+    def from_params(cls, params: Optional[Dict[str, Any]], t0: Optional[float] = None) -> "EvalBudget":
+        params = params or {}
+        return cls(params.get("max_seconds"), params.get("max_evals"), t0)
+
+    def seconds_left(self) -> Optional[float]:
+        return None if self.max_seconds is None else max(0.0, self.max_seconds - (time.time() - self.t0))
+
+    def evals_left(self, used: int) -> int:
+        return (1 << 60) if self.max_evals is None else max(0, self.max_evals - int(used))
+
+    def exhausted(self, used: int = 0) -> bool:
+        left = self.seconds_left()
+        self.hit = self.hit or (left is not None and left <= 0) or self.evals_left(used) <= 0
+        return self.hit
+
+    def check(self, used: int = 0) -> None:
+        if self.exhausted(used):
+            raise BudgetExhausted()
+
 # --- In-memory snapshot store (dev/use) ---
 SNAPSHOTS: Dict[str, pd.DataFrame] = {}
 SNAPSHOT_SEQ = itertools.count(1)
@@ -2540,6 +3242,9 @@ def simulate_scheme_over_entries(
       - Pozisyon açıkken yeni sinyaller ignore edilir
       - Aynı barda çelişkili sinyaller ignore edilir
       - Masraf hesaplaması düzeltildi
+
+    entries: bool seri (+ opsiyonel sgn_series) ya da hazır SparseEntries.
+    Dönüş: TradeLog (JSON kayıtlar için .to_records()).
     """
 
     # ---------- helpers ----------
@@ -2552,278 +3257,222 @@ def simulate_scheme_over_entries(
         ])
         return pd.Series(tr, index=_df.index).rolling(int(n), min_periods=int(n)).mean()
 
-    def _bb_levels_at(i: int, n: int, std_k: float, ma: str = "SMA"):
-        """Sadece geçmişi kullanarak i'nci bar için BB mid/upper/lower (ddof=0)."""
+    def _bb_bands(n: int, std_k: float, ma: str = "SMA"):
+        """Her bar için sadece son n barı kullanan BB upper/lower (ddof=0); ısınmada NaN."""
         n = int(n); std_k = float(std_k)
-        win = df["close"].iloc[max(0, i - n + 1): i + 1]
-        if len(win) < n:
-            return None, None, None
+        c = df["close"].astype(float)
         if (ma or "SMA").upper() == "EMA":
-            mid = win.ewm(span=n, adjust=False).mean().iloc[-1]
+            # pencere başından başlatılan EMA (adjust=False) = sabit ağırlıklı toplam
+            alpha = 2.0 / (n + 1.0)
+            w = alpha * (1.0 - alpha) ** np.arange(n - 1, -1, -1)
+            w[0] = (1.0 - alpha) ** (n - 1)
+            mid = np.full(len(c), np.nan)
+            if len(c) >= n:
+                mid[n - 1:] = np.lib.stride_tricks.sliding_window_view(c.to_numpy(), n) @ w
         else:
-            mid = win.rolling(n).mean().iloc[-1]
-        dev = win.rolling(n).std(ddof=0).iloc[-1]
-        up  = mid + std_k * dev
-        lo  = mid - std_k * dev
-        return float(mid), float(up), float(lo)
-
-    def _stamp(i: int):
-        ts = df.index[i]
-        try:    return ts.isoformat()
-        except: return str(ts)
+            mid = c.rolling(n).mean().to_numpy()
+        dev = c.rolling(n).std(ddof=0).to_numpy()
+        return mid + std_k * dev, mid - std_k * dev
 
-    # price precision (ccxt markets'ten)
+    # price precision (ccxt markets'ten) — yuvarlama/zaman damgası TradeLog.to_records'ta
     price_precision = get_price_precision(symbol)
 
-    def _round_px(px: float, p: int) -> float:
-        if p is None: return float(px)
-        q = 10 ** int(p)
-        return round(float(px) * q) / q
-
     # ---------- costs & setup ----------
     fee  = float(fee_pct or 0.0) / 100.0
     slip = float(slippage_pct or 0.0) / 100.0
     net_cost = 2.0 * (fee + slip)  # DÜZELTME: 2*(fee+slip)
+    lev_f = float(lev or 1.0)
 
-    trades = []
+    # TradeLog kolonları (trade başına dict yok)
+    ent_i, ex_i, ent_px, ex_px, sides, reasons, pnls, tph, slh = ([] for _ in range(9))
     default_sgn = 1 if side > 0 else -1
     stop_first = bool(getattr(sch, "stop_first", True))
-
-    in_pos   = False
-    pos_sgn  = None
-    entry_i  = None
-    entry_ts = None
-    entry_px = None
-    tp = sl = None
-    highest = lowest = None
-
-    # ATR ön-hazırlık (ATR şeması için)
-    atr_pre = _atr_series(df, int(getattr(sch, "atr_n", 14))) if getattr(sch, "type", None) == "atr" else None
-
-    for i in range(len(df)):
-        h = float(df["high"].iat[i]); l = float(df["low"].iat[i]); c = float(df["close"].iat[i])
-
-        # ---------------- IN-POSITION: EXIT KONTROLÜ ----------------
-        if in_pos:
-            sgn = pos_sgn
-
-            # seviyeleri güncelle
-            if sch.type == "trailing_pct":
-                frac = float(getattr(sch, "trail_pct", 0.01) or 0.01)
-                if sgn > 0:
-                    highest = max(highest, h)
-                    sl = highest * (1 - frac)
-                else:
-                    lowest  = min(lowest,  l)
-                    sl = lowest * (1 + frac)
-                tp = None  # trailing'de TP yok
-
-            elif sch.type == "bollinger":
-                n   = int(getattr(sch, "n", 20) or 20)
-                std = float(getattr(sch, "std", 2.0) or 2.0)
-                ma  = getattr(sch, "ma", "SMA") or "SMA"
-                mid, up, lo = _bb_levels_at(i, n, std, ma)
-                if up is not None:
-                    if sgn > 0:  # long
-                        tp, sl = up, lo
-                    else:        # short
-                        tp, sl = lo, up
-
-            elif sch.type == "chandelier":
-                ch_n = int(getattr(sch, "n", 22) or 22)
-                ch_k = float(getattr(sch, "factor", 3.0) or 3.0)
-                atr_ch = _atr_series(df, ch_n)
-                if not pd.isna(atr_ch.iat[i]):
-                    if sgn > 0:
-                        hh = df["high"].rolling(ch_n, min_periods=ch_n).max()
-                        sl = float(hh.iat[i] - ch_k * atr_ch.iat[i])
-                    else:
-                        ll = df["low"].rolling(ch_n, min_periods=ch_n).min()
-                        sl = float(ll.iat[i] + ch_k * atr_ch.iat[i])
-                tp = None  # chandelier'da TP yok
-
-            # tetik kontrolleri
-            hit_tp = (tp is not None) and ((sgn > 0 and h >= tp) or (sgn < 0 and l <= tp))
-            hit_sl = (sl is not None) and ((sgn > 0 and l <= sl) or (sgn < 0 and h >= sl))
-
-            if hit_tp or hit_sl:
-                if hit_tp and hit_sl:
-                    exit_px = sl if stop_first else tp
-                    reason  = "sl" if stop_first else "tp"
-                elif hit_tp:
-                    exit_px = tp; reason = "tp"
-                else:
-                    exit_px = sl; reason = "sl"
-
-                # PnL (oran) + masraf
-                raw = (exit_px - entry_px)/entry_px if sgn > 0 else (entry_px - exit_px)/entry_px
-                pnl = raw * float(lev or 1.0) - net_cost
-
-                # TP/SL bayraklarını exit tipine göre yaz,
-                # trailing/chandelier için kâr/zarara göre görsel tick at.
-                if sch.type in ("trailing_pct", "chandelier"):
-                    tp_hit = pnl >= 0
-                    sl_hit = pnl < 0
-                else:
-                    tp_hit = (reason == "tp")
-                    sl_hit = (reason == "sl")
-
-                tstamp = _stamp(i)
-                trades.append({
-                    "ts": tstamp, "time": tstamp,
-                    "entry_ts": entry_ts, "exit_ts": tstamp,
-                    "side": "long" if sgn > 0 else "short",
-                    "entry": _round_px(entry_px, price_precision),
-                    "exit":  _round_px(float(exit_px), price_precision),
-                    "price_precision": int(price_precision),
-                    "pnl": pnl,
-                    "exit_reason": reason,
-                    "tp_hit": bool(tp_hit),
-                    "sl_hit": bool(sl_hit),
-                    "entry_i": int(entry_i) if entry_i is not None else None,
-                })
-
-                # reset
-                in_pos = False
-                pos_sgn = None
-                entry_i = None
-                entry_ts = None
-                entry_px = None
-                tp = sl = None
-                highest = lowest = None
-                continue
-
-        # ---------------- OUT-OF-POSITION: ENTRY KONTROLÜ ----------------
-        # Pozisyon açıkken yeni sinyalleri ignore et
-        if in_pos:
-            continue
-            
-        # Sinyal var mı?
-        if not bool(entries.iat[i]):
-            continue
-
-        # Sinyal yönünü belirle
-        if sgn_series is not None:
-            current_sgn = int(np.sign(sgn_series.iat[i]) or 0)
-            if current_sgn == 0:
-                continue  # Çelişkili sinyal veya sinyal yok
-            sgn = current_sgn
+    typ = getattr(sch, "type", None)
+
+    high  = df["high"].to_numpy(dtype=float)
+    low   = df["low"].to_numpy(dtype=float)
+    close = df["close"].to_numpy(dtype=float)
+    n_bars = close.size
+
+    # şema seviyeleri tek seferde (bar başına rolling yok)
+    if typ == "fixed":
+        tp_pct = float(getattr(sch, "tp_pct", 0.0) or 0.0)
+        sl_pct = float(getattr(sch, "sl_pct", 0.0) or 0.0)
+    elif typ == "atr":
+        atr_pre = _atr_series(df, int(getattr(sch, "atr_n", 14))).to_numpy()
+        mtp = float(getattr(sch, "m_tp", 0.0) or 0.0)
+        ksl = float(getattr(sch, "k_sl", 0.0) or 0.0)
+    elif typ == "bollinger":
+        bb_up, bb_lo = _bb_bands(int(getattr(sch, "n", 20) or 20),
+                                 float(getattr(sch, "std", 2.0) or 2.0),
+                                 getattr(sch, "ma", "SMA") or "SMA")
+    elif typ == "trailing_pct":
+        frac = float(getattr(sch, "trail_pct", 0.01) or 0.01)
+    elif typ == "chandelier":
+        ch_n = int(getattr(sch, "n", 22) or 22)
+        ch_k = float(getattr(sch, "factor", 3.0) or 3.0)
+        atr_ch = _atr_series(df, ch_n).to_numpy()
+        ch_long = df["high"].rolling(ch_n, min_periods=ch_n).max().to_numpy() - ch_k * atr_ch
+        ch_short = df["low"].rolling(ch_n, min_periods=ch_n).min().to_numpy() + ch_k * atr_ch
+
+    def _record(entry_i, entry_px, sgn, j, exit_px, reason):
+        # PnL (oran) + masraf
+        raw = (exit_px - entry_px)/entry_px if sgn > 0 else (entry_px - exit_px)/entry_px
+        pnl = raw * lev_f - net_cost
+        # trailing/chandelier: TP kavramı yok, kâr/zarara göre görsel tick
+        if typ in ("trailing_pct", "chandelier"):
+            tp_hit = pnl >= 0
+            sl_hit = pnl < 0
         else:
-            sgn = default_sgn
-
-        # Side filtresi uygula
-        if side > 0 and sgn <= 0:
-            continue  # Long-only mode, ama short sinyal
-        if side < 0 and sgn >= 0:
-            continue  # Short-only mode, ama long sinyal
-
-        # Pozisyon aç
-        pos_sgn  = sgn
-        entry_i  = i
-        entry_ts = _stamp(i)
-        entry_px = float(df["close"].iat[i])  # sinyal barı kapanışı
-
-        # başlangıç seviyeleri
+            tp_hit = (reason == _R_TP)
+            sl_hit = (reason == _R_SL)
+        ent_i.append(entry_i); ex_i.append(j)
+        ent_px.append(entry_px); ex_px.append(float(exit_px))
+        sides.append(sgn); reasons.append(reason)
+        pnls.append(pnl); tph.append(bool(tp_hit)); slh.append(bool(sl_hit))
+
+    # Seyrek girişler: flat iken searchsorted ile sıradaki sinyale atla.
+    # Pozisyon açıkken gelen ve çelişkili (sgn=0) sinyaller zaten listede yok/atlanır.
+    sp = entries if isinstance(entries, SparseEntries) else SparseEntries.from_mask(entries, sgn_series, side)
+
+    k = 0
+    while k < len(sp):
+        i = int(sp.idx[k]); sgn = int(sp.sgn[k])
+        entry_px = float(close[i])  # sinyal barı kapanışı
+
+        # ---------------- ENTRY: başlangıç seviyeleri ----------------
         tp = sl = None
-        entry_valid = True  # Pozisyon açılabilir mi?
-        
-        if sch.type == "fixed":
-            tp_pct = float(getattr(sch, "tp_pct", 0.0) or 0.0)
-            sl_pct = float(getattr(sch, "sl_pct", 0.0) or 0.0)
+        if typ == "fixed":
             if sgn > 0:
                 tp = entry_px * (1 + tp_pct); sl = entry_px * (1 - sl_pct)
             else:
                 tp = entry_px * (1 - tp_pct); sl = entry_px * (1 + sl_pct)
-
-        elif sch.type == "atr":
-            if atr_pre is None or pd.isna(atr_pre.iat[i]):
-                entry_valid = False
-            else:
-                a   = float(atr_pre.iat[i])
-                mtp = float(getattr(sch, "m_tp", 0.0) or 0.0)
-                ksl = float(getattr(sch, "k_sl", 0.0) or 0.0)
-                if sgn > 0:
-                    tp = entry_px + mtp * a; sl = entry_px - ksl * a
-                else:
-                    tp = entry_px - mtp * a; sl = entry_px + ksl * a
-
-        elif sch.type == "bollinger":
-            n   = int(getattr(sch, "n", 20) or 20)
-            std = float(getattr(sch, "std", 2.0) or 2.0)
-            ma  = getattr(sch, "ma", "SMA") or "SMA"
-            mid, up, lo = _bb_levels_at(i, n, std, ma)
-            if (up is None) or (lo is None):
-                entry_valid = False
+        elif typ == "atr":
+            a = atr_pre[i]
+            if np.isnan(a):
+                k += 1; continue  # geçersiz kurulum - pozisyon açılmaz
+            if sgn > 0:
+                tp = entry_px + mtp * a; sl = entry_px - ksl * a
             else:
-                if sgn > 0:
-                    tp, sl = up, lo
-                else:
-                    tp, sl = lo, up
-
-        elif sch.type == "trailing_pct":
-            frac = float(getattr(sch, "trail_pct", 0.01) or 0.01)
+                tp = entry_px - mtp * a; sl = entry_px + ksl * a
+        elif typ == "bollinger":
+            if np.isnan(bb_up[i]) or np.isnan(bb_lo[i]):
+                k += 1; continue
+            tp, sl = (bb_up[i], bb_lo[i]) if sgn > 0 else (bb_lo[i], bb_up[i])
+        elif typ == "trailing_pct":
             sl = entry_px * (1 - frac) if sgn > 0 else entry_px * (1 + frac)
-            tp = None
-
-        elif sch.type == "chandelier":
-            ch_n = int(getattr(sch, "n", 22) or 22)
-            ch_k = float(getattr(sch, "factor", 3.0) or 3.0)
-            atr_ch = _atr_series(df, ch_n)
-            if pd.isna(atr_ch.iat[i]):
-                entry_valid = False
-            else:
-                if sgn > 0:
-                    hh = df["high"].rolling(ch_n, min_periods=ch_n).max()
-                    sl = float(hh.iat[i] - ch_k * atr_ch.iat[i])
-                else:
-                    ll = df["low"].rolling(ch_n, min_periods=ch_n).min()
-                    sl = float(ll.iat[i] + ch_k * atr_ch.iat[i])
-                tp = None
-
-        # Pozisyonu aktifleştir (geçerli kurulum varsa)
-        if entry_valid:
-            in_pos  = True
-            highest = lowest = entry_px
+        elif typ == "chandelier":
+            if np.isnan(atr_ch[i]):
+                k += 1; continue
+            sl = float(ch_long[i] if sgn > 0 else ch_short[i])
+
+        # ---------------- IN-POSITION: EXIT KONTROLÜ (i+1'den itibaren) ----------------
+        exit_j = -1
+        if typ in ("fixed", "atr"):
+            # sabit seviyeler: ilk tetik barını blok blok vektörel ara
+            upper, lower = (tp, sl) if sgn > 0 else (sl, tp)
+            exit_j = _first_cross(high, low, i + 1, upper, lower)
+            if exit_j >= 0:
+                h = high[exit_j]; l = low[exit_j]
+                hit_tp = (sgn > 0 and h >= tp) or (sgn < 0 and l <= tp)
+                hit_sl = (sgn > 0 and l <= sl) or (sgn < 0 and h >= sl)
         else:
-            # Geçersiz kurulum - pozisyon açılmaz
-            pos_sgn = None
-            entry_i = None
-            entry_ts = None
-            entry_px = None
-
-    # Son barda açık pozisyonu kapat
-    if in_pos and entry_px is not None:
-        sgn = pos_sgn if pos_sgn is not None else default_sgn
-        exit_px = float(df["close"].iat[-1])
-        raw = (exit_px - entry_px)/entry_px if sgn > 0 else (entry_px - exit_px)/entry_px
-        pnl = raw * float(lev or 1.0) - net_cost
-        tstamp = _stamp(len(df) - 1)
+            highest = lowest = entry_px
+            for j in range(i + 1, n_bars):
+                h = high[j]; l = low[j]
+                # seviyeleri güncelle
+                if typ == "trailing_pct":
+                    if sgn > 0:
+                        highest = max(highest, h); sl = highest * (1 - frac)
+                    else:
+                        lowest = min(lowest, l); sl = lowest * (1 + frac)
+                elif typ == "bollinger":
+                    if not np.isnan(bb_up[j]):
+                        tp, sl = (bb_up[j], bb_lo[j]) if sgn > 0 else (bb_lo[j], bb_up[j])
+                elif typ == "chandelier":
+                    if not np.isnan(atr_ch[j]):
+                        sl = float(ch_long[j] if sgn > 0 else ch_short[j])
+
+                hit_tp = (tp is not None) and ((sgn > 0 and h >= tp) or (sgn < 0 and l <= tp))
+                hit_sl = (sl is not None) and ((sgn > 0 and l <= sl) or (sgn < 0 and h >= sl))
+                if hit_tp or hit_sl:
+                    exit_j = j
+                    break
 
-        # trailing/chandelier için görsel tick kuralını koru
-        if sch.type in ("trailing_pct", "chandelier"):
-            tp_hit = pnl >= 0
-            sl_hit = pnl < 0
+        if exit_j < 0:
+            # Son barda açık pozisyonu kapat
+            _record(i, entry_px, sgn, n_bars - 1, close[-1], _R_FORCE)
+            break
+
+        if hit_tp and hit_sl:
+            exit_px, reason = (sl, _R_SL) if stop_first else (tp, _R_TP)
+        elif hit_tp:
+            exit_px, reason = tp, _R_TP
         else:
-            tp_hit = False
-            sl_hit = False
-
-        trades.append({
-            "ts": tstamp, "time": tstamp,
-            "entry_ts": entry_ts, "exit_ts": tstamp,
-            "side": "long" if sgn > 0 else "short",
-            "entry": _round_px(entry_px, price_precision),
-            "exit":  _round_px(exit_px,  price_precision),
-            "price_precision": int(price_precision),
-            "pnl": pnl, "exit_reason": "force",
-            "tp_hit": bool(tp_hit), "sl_hit": bool(sl_hit),
-            "entry_i": int(entry_i) if entry_i is not None else None,
-        })
+            exit_px, reason = sl, _R_SL
+        _record(i, entry_px, sgn, exit_j, exit_px, reason)
 
-    return trades
+        # çıkış barında yeni giriş yok; sıradaki sinyale atla
+        k = sp.next_at(exit_j + 1)
 
+    return TradeLog.from_lists(
+        df.index, ent_i, ex_i, ent_px, ex_px, sides, reasons, pnls, tph, slh,
+        kind="scheme", meta={"price_precision": price_precision},
+    )
+
+
+def stack_intents(index, strat_intents: Dict[str, Any], priorities: Optional[Dict[str, int]] = None):
+    """
+    {name -> {-1,0,1} serisi} -> (n_bars × n_strat) int8 intent matrisi.
+    Kolonlar önceliğe göre sıralanır (küçük sayı üstün); dönüş: (matrix, names).
+    """
+    priorities = priorities or {}
+    names = sorted(strat_intents.keys(), key=lambda k: priorities.get(k, 1_000_000))
+    mat = np.zeros((len(index), len(names)), dtype=np.int8)
+    for j, k in enumerate(names):
+        v = strat_intents[k]
+        v = v.reindex(index) if isinstance(v, pd.Series) else pd.Series(np.asarray(v), index=index)
+        mat[:, j] = np.sign(pd.to_numeric(v, errors="coerce").fillna(0).to_numpy())
+    return mat, names
+
+def merge_signals_conflict_only(df, strat_intents, prefer="skip", priorities=None):
+    """
+    Çoklu strateji sinyal birleştirme (vektörel; canlı motor ve batch backtest ortak kullanır).
+    strat_intents: {name -> pd.Series of {-1,0,1}}
+    ÇAKIŞMA çözümü (aynı barda hem long hem short oyu varsa):
+        prefer="skip"     -> 0
+        prefer="long"     -> 1
+        prefer="short"    -> -1
+        prefer="priority" -> en yüksek öncelikli (priorities'te en küçük) stratejinin oyu
+    Aksi halde o barın tek yönü alınır.
+    Dönüş:
+      sgn: {-1,0,1} (her bar için hedef yön)
+      entries: bool  (işaret değişimi ile tanımlanır)
+    """
+    idx = df.index if hasattr(df, "index") else df
+    mat, _ = stack_intents(idx, strat_intents, priorities)
+
+    have_long = (mat > 0).any(axis=1)
+    have_short = (mat < 0).any(axis=1)
+    sgn = have_long.astype(np.int8) - have_short.astype(np.int8)  # çakışmada 0
+
+    conflict = have_long & have_short
+    if conflict.any() and prefer != "skip":
+        if prefer == "long":
+            sgn[conflict] = 1
+        elif prefer == "short":
+            sgn[conflict] = -1
+        elif prefer == "priority":
+            rows = np.flatnonzero(conflict)
+            first = np.argmax(mat[rows] != 0, axis=1)  # öncelik sırasında ilk oy
+            sgn[rows] = mat[rows, first]
+
+    # Giriş kuralı: işaret değişimi (0→±1 veya +1↔−1)
+    prev = np.concatenate(([0], sgn[:-1])) if len(sgn) else sgn
+    entries = (sgn != 0) & (sgn != prev)
+
+    return pd.Series(sgn.astype(int), index=idx), pd.Series(entries, index=idx)
 
-from fastapi import HTTPException
-from fastapi import HTTPException
 
 @app.post("/backtest/run_with_exit")
 def backtest_run_with_exit(req: BacktestRunReqPlus):
@@ -2845,55 +3494,6 @@ def backtest_run_with_exit(req: BacktestRunReqPlus):
         except Exception:
             return default
 
-    def merge_signals_conflict_only(df, strat_intents, prefer="skip", priorities=None):
-        """
-        strat_intents: {name -> pd.Series of {-1,0,1}}
-        ÇAKIŞMA çözümü:
-          - Aynı barda hem long hem short varsa:
-              prefer="skip"  -> 0
-              prefer="long"  -> 1
-              prefer="short" -> -1
-          - Aksi halde o barın tek yönünü al.
-        Dönüş:
-          sgn: {-1,0,1} (her bar için hedef yön)
-          entries: bool  (işaret değişimi ile tanımlanır)
-        """
-        idx = df.index
-        intents = {k: v.reindex(idx).fillna(0).astype(int) for k, v in strat_intents.items()}
-
-        # Öncelik sırası (küçük sayı üstün) sadece prefer != "skip" iken işe yarar
-        priorities = priorities or {}
-        order = sorted(intents.items(), key=lambda kv: priorities.get(kv[0], 1_000_000))
-
-        sgn = np.zeros(len(idx), dtype=int)
-
-        for i in range(len(idx)):
-            votes = [int(series.iat[i]) for _, series in order if int(series.iat[i]) != 0]
-            if not votes:
-                sgn[i] = 0
-                continue
-
-            have_long  = any(v > 0 for v in votes)
-            have_short = any(v < 0 for v in votes)
-
-            if have_long and have_short:
-                if prefer == "long":
-                    sgn[i] = 1
-                elif prefer == "short":
-                    sgn[i] = -1
-                else:  # "skip"
-                    sgn[i] = 0
-            else:
-                sgn[i] = 1 if have_long else -1
-
-        sgn_series = pd.Series(sgn, index=idx)
-
-        # Giriş kuralı: işaret değişimi (0→±1 veya +1↔−1)
-        prev = sgn_series.shift(1).fillna(0).astype(int)
-        entries = (sgn_series != 0) & (sgn_series != prev)
-
-        return sgn_series, entries
-
     try:
         # ---------- 0) Veri ----------
         sid = getattr(req, "data_snapshot_id", None)
@@ -2959,9 +3559,11 @@ def backtest_run_with_exit(req: BacktestRunReqPlus):
 
             strat_intents = {nm: _expr_to_intent(e) for nm, e in zip(names, exprs)}
 
-            # ÇAKIŞMA: aynı barda long+short → skip (sgn=0); in_pos burada tutulmaz.
+            # ÇAKIŞMA: aynı barda long+short → varsayılan skip (sgn=0); in_pos burada tutulmaz.
             sgn_series, entries = merge_signals_conflict_only(
-                df, strat_intents, prefer="skip", priorities=None
+                df, strat_intents,
+                prefer=(getattr(req, "prefer", None) or "skip"),
+                priorities=getattr(req, "priorities", None),
             )
 
         # ---------- 5) Simülasyon ----------
@@ -2973,24 +3575,23 @@ def backtest_run_with_exit(req: BacktestRunReqPlus):
         )
 
         # ---------- 6) İstatistik + günlük kâr ----------
-        wins = sum(float(t.get("pnl", 0.0)) > 0.0 for t in trades)
-        pnl_sum = float(np.sum([float(t.get("pnl", 0.0)) for t in trades])) if trades else 0.0
+        k = _kernel_row(trade_stats_kernel(trades.pnl))
         stats = {
-            "trades": len(trades),
-            "winrate": (wins / len(trades)) * 100.0 if trades else 0.0,
-            "pnl": pnl_sum,
-            "profit": pnl_sum,
+            "trades": k["trades"],
+            "winrate": k["winRate"],
+            "pnl": k["sum"],
+            "profit": k["sum"],
         }
 
         daily_profits = []
         if trades:
-            idx = pd.to_datetime([t.get("ts") or t.get("time") for t in trades])
-            pnl_s = pd.Series([t.get("pnl", 0.0) for t in trades], index=idx).resample("1D").sum()
+            idx = pd.to_datetime(trades.index[trades.exit_i])
+            pnl_s = pd.Series(trades.pnl, index=idx).resample("1D").sum()
             daily_profits = [{"date": d.strftime("%Y-%m-%d"), "profit": float(v)} for d, v in pnl_s.items()]
 
         return {
             "stats": stats,
-            "signals": trades,
+            "signals": trades.to_records(),
             "daily_profits": daily_profits,
             "scheme_source": sch_source
         }
@@ -3024,34 +3625,105 @@ class BacktestRequest(BaseModel):
     exit_schemes: List[ExitScheme] = []
     compare_on_same_entries: bool = True
 
-def stats_from_trades_basic(signals: List[Dict[str, Any]]) -> Dict[str, float]:
-    if not signals:
-        return {"profit": 0.0, "winRate": 0.0, "trades": 0, "wins": 0, "losses": 0, "sharpe": 0.0, "maxDD": 0.0, "pf": 0.0}
-    
-    ret = np.array([float(s.get("pnl",0.0)) for s in signals], dtype=float)
-    wins = int((ret > 0).sum()); losses = int((ret <= 0).sum())
-    trades = int(len(ret))
-    
-    # ### DÜZELTME: Bileşik getiri (compounded profit) hesaplaması ###
-    # Her işlemin getirisi bir önceki sermayeye eklenir.
-    eq = np.cumprod(1.0 + ret)
-    profit_pct = (eq[-1] - 1.0) * 100.0 if len(eq) > 0 else 0.0
-
-    # Equity curve ve Max Drawdown hesaplaması
-    peak = np.maximum.accumulate(eq)
-    dd = (eq / peak) - 1.0
-    maxDD = float(dd.min() * 100.0)
-    # ##################################################################
-
-    std = float(ret.std(ddof=1)) if trades > 1 else 0.0
-    mean = float(ret.mean()) if trades > 0 else 0.0
-    sharpe = float((mean / (std + 1e-12)) * np.sqrt(max(trades, 1)))
-    
-    gains = float(ret[ret > 0].sum()); losses_abs = float(-ret[ret <= 0].sum())
-    pf = float(gains / (losses_abs + 1e-12))
-    winRate = float((wins / trades) * 100.0) if trades else 0.0
-    
-    return {"profit": profit_pct, "winRate": winRate, "trades": trades, "wins": wins, "losses": losses, "sharpe": sharpe, "maxDD": maxDD, "pf": pf}
+def stats_from_trades_basic(signals) -> Dict[str, float]:
+    # bileşik getiri (compounded profit) + çarpımsal max drawdown; bkz. trade_stats_kernel
+    return _basic_from_kernel(_kernel_row(trade_stats_kernel(_trade_pnl(signals))))
+
+
+# ---- kalıcı / devam ettirilebilir Optuna çalışmaları
+# storage: "journal" (çok süreçli yazıma uygun) | "sqlite" | "memory". Varsayılan bellek;
+# OPTUNA_STORAGE sadece storage/resume istendiğinde ya da n_workers > 1 iken kullanılan kalıcı tür.
+OPTUNA_STORAGE = os.environ.get("OPTUNA_STORAGE", "journal")
+OPTUNA_STORAGE_PATH = os.environ.get("OPTUNA_STORAGE_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "optuna_studies")))
+
+def optuna_storage_kind(params: Optional[Dict[str, Any]]) -> str:
+    params = params or {}
+    if params.get("storage"):
+        return str(params["storage"]).lower()
+    if params.get("resume") or int(params.get("n_workers", 1) or 1) > 1:
+        return OPTUNA_STORAGE
+    return "memory"  # tek seferlik koşu: paylaşılan log dosyası büyümesin
+
+def _optuna_storage(kind: Optional[str]):
+    kind = (kind or OPTUNA_STORAGE).lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        return optuna.storages.RDBStorage(f"sqlite:///{OPTUNA_STORAGE_PATH}.sqlite",
+                                          engine_kwargs={"connect_args": {"timeout": 30}})
+    try:
+        from optuna.storages.journal import JournalFileBackend
+        backend = JournalFileBackend(f"{OPTUNA_STORAGE_PATH}.log")
+    except ImportError:  # optuna < 4
+        backend = optuna.storages.JournalFileStorage(f"{OPTUNA_STORAGE_PATH}.log")
+    return optuna.storages.JournalStorage(backend)
+
+def open_optuna_study(fingerprint: str, direction: str, sampler, pruner=None,
+                      storage_kind: Optional[str] = None, resume: bool = False):
+    """
+    Strateji parmak iziyle adlandırılmış çalışma. resume=True -> aynı parmak izli en son
+    çalışma geçmişiyle devam eder; aksi halde yeni (zaman damgalı) çalışma açılır.
+    """
+    storage = _optuna_storage(storage_kind)
+    if storage is None:
+        return optuna.create_study(direction=direction, sampler=sampler, pruner=pruner)
+    name = None
+    if resume:
+        prev = [n for n in optuna.get_all_study_names(storage) if n.startswith(fingerprint)]
+        name = max(prev) if prev else None
+    if name is None:
+        name = f"{fingerprint}-{time.strftime('%Y%m%d%H%M%S')}-{uuid4().hex[:6]}"
+    return optuna.create_study(study_name=name, storage=storage, direction=direction,
+                               sampler=sampler, pruner=pruner, load_if_exists=True)
+
+def _even_shares(total: int, n: int) -> List[int]:
+    return [total // n + (1 if i < total % n else 0) for i in range(n)]
+
+def _optuna_worker(ctx: Dict[str, Any], item) -> bool:
+    # ayrı süreç: aynı çalışmayı storage'dan yükle, kendi sampler'ıyla trial çek.
+    # Dönüş: bütçe bu worker'da bitti mi (tamamlanan trial'lar storage'da kalır).
+    n_trials, cap = item
+    budget = ctx.get("budget")
+    max_evals = budget.max_evals if budget is not None else None
+    if cap is not None:  # fork edilen bütçe kopyası: max_evals'ın bu worker'a düşen payı
+        budget.max_evals = ctx["used"]() + cap
+    study = optuna.load_study(study_name=ctx["study_name"], storage=_optuna_storage(ctx["storage"]),
+                              sampler=ctx["make_sampler"](), pruner=ctx["pruner"])
+    try:
+        study.optimize(ctx["objective"], n_trials=int(n_trials), timeout=ctx.get("timeout"))
+    except BudgetExhausted:
+        return True
+    finally:
+        if budget is not None:
+            budget.max_evals = max_evals
+        EVAL_CACHE.flush()
+    return bool(budget is not None and budget.hit)
+
+def run_optuna_study(study, objective, n_trials: int, make_sampler, pruner=None,
+                     storage_kind: Optional[str] = None, n_workers: int = 1, runner=None,
+                     timeout: Optional[float] = None, budget: Optional[EvalBudget] = None, used=None):
+    """
+    n_workers > 1 ve kalıcı storage -> trial'lar worker süreçlerine bölünür (hepsi aynı çalışmadan çeker).
+    Aksi halde runner(study) (örn. batch ask/tell) ya da study.optimize.
+    budget/used(): objective'in kullandığı EvalBudget ve o ana kadarki değerlendirme sayısı; kalan
+    max_evals worker'lara paylaştırılır. Bütçe biterse BudgetExhausted (tamamlanan trial'lar study'de).
+    """
+    n_workers = max(1, int(n_workers or 1))
+    if n_workers > 1 and (storage_kind or OPTUNA_STORAGE).lower() != "memory" and n_trials > 1:
+        n_workers = min(n_workers, n_trials)
+        caps = [None] * n_workers
+        if budget is not None and budget.max_evals is not None:
+            caps = _even_shares(budget.evals_left(used() if used else 0), n_workers)
+        ctx = {"study_name": study.study_name, "storage": storage_kind, "make_sampler": make_sampler,
+               "pruner": pruner, "objective": objective, "timeout": timeout,
+               "budget": budget, "used": used or (lambda: 0)}
+        if any(_map_ordered(_optuna_worker, list(zip(_even_shares(n_trials, n_workers), caps)), ctx, n_jobs=n_workers)):
+            raise BudgetExhausted()
+    elif runner is not None:
+        runner(study)
+    else:
+        study.optimize(objective, n_trials=n_trials, timeout=timeout)
+    return study
 
 
 def _optimize_optuna(fdf, bounds_a, conf, cols, params: Dict | None = None, sampler_type: str = "tpe") -> List[tuple]:
@@ -3065,12 +3737,16 @@ def _optimize_optuna(fdf, bounds_a, conf, cols, params: Dict | None = None, samp
 
     optuna.logging.set_verbosity(optuna.logging.WARNING)
     
-    if sampler_type == "cmaes":
-        sampler = optuna.samplers.CmaEsSampler()
-    else: # default to tpe
-        sampler = optuna.samplers.TPESampler(n_startup_trials=n_startup_trials)
-        
-    study = optuna.create_study(direction="maximize", sampler=sampler)
+    def make_sampler():
+        if sampler_type == "cmaes":
+            return optuna.samplers.CmaEsSampler()
+        return optuna.samplers.TPESampler(n_startup_trials=n_startup_trials)  # default to tpe
+
+    storage_kind = optuna_storage_kind(params)
+    fingerprint = "filters-" + eval_cache_key(data=df_fingerprint(fdf[cols]), cols=cols, bounds=bounds_a,
+                                              conf=conf, sampler=sampler_type)[:16]
+    study = open_optuna_study(fingerprint, "maximize", make_sampler(), storage_kind=storage_kind,
+                              resume=bool(params.get("resume")))
 
     def objective(trial):
         intervals_n = {}
@@ -3084,7 +3760,8 @@ def _optimize_optuna(fdf, bounds_a, conf, cols, params: Dict | None = None, samp
         m = _metrics(fdf, mask, mask_pos, conf)
         return _obj(m, conf)
 
-    study.optimize(objective, n_trials=n_trials)
+    run_optuna_study(study, objective, n_trials, make_sampler, storage_kind=storage_kind,
+                     n_workers=int(params.get("n_workers", 1) or 1))
     
     # En iyi sonucu al ve formatla
     best_p = study.best_params
@@ -3097,6 +3774,372 @@ def _optimize_optuna(fdf, bounds_a, conf, cols, params: Dict | None = None, samp
     return [(study.best_value, 0, payload)]
 
 
+# ---- optimize_core aday simülasyonu (process pool worker'larında da çalışır)
+def _core_simulate(ctx: Dict[str, Any], params: Dict[str, Any], n_rows: Optional[int] = None) -> TradeLog:
+    req = ctx["req"]
+    src = ctx["df"] if n_rows is None else ctx["df"].iloc[:n_rows]
+    df = compute_indicators(src, timeframe=req.timeframe, **{**(req.indicators or {}), **params})
+    ent_signed = expr_to_entries(df, req.expr, req.params or {}, side=req.side, respect_expr_sign=True)
+    sgn_series = pd.Series(np.sign(ent_signed).astype(int), index=df.index)
+    return simulate_scheme_over_entries(
+        df, req.symbol, sgn_series != 0, req.side, req.leverage, ctx["sch"],
+        sgn_series=sgn_series, fee_pct=req.fee_pct, slippage_pct=req.slippage_pct
+    )
+
+def _core_pnl(ctx: Dict[str, Any], item) -> np.ndarray:
+    # worker sadece pnl dizisini döndürür; stats ana süreçte batch çekirdeğiyle hesaplanır
+    params, n_rows = item
+    return _trade_pnl(_core_simulate(ctx, params, n_rows))
+
+
+# ---- ölçeklenebilir surrogate ile Bayesian optimizasyon (ağaç topluluğu)
+SURROGATES = ("gp", "et", "rf")
+
+def surrogate_kind(params: Optional[Dict[str, Any]]) -> str:
+    """method_params.surrogate -> gp | et | rf; bilinmeyen değer 422 (sessizce ExtraTrees'e düşmesin)."""
+    kind = str((params or {}).get("surrogate", "gp")).lower()
+    if kind not in SURROGATES:
+        raise HTTPException(status_code=422, detail=f"Unknown surrogate '{kind}'. Use one of: {', '.join(SURROGATES)}.")
+    return kind
+
+def surrogate_minimize(objective_batch, bounds: List[tuple], n_calls: int = 150, n_initial_points: int = 10,
+                       surrogate: str = "et", refit_every: int = 1, batch_size: int = 1,
+                       n_candidates: int = 2000, xi: float = 0.01, seed: Optional[int] = 42,
+                       x0: Optional[List[tuple]] = None) -> Dict[str, Any]:
+    """
+    GP yerine ağaç topluluğu (et: ExtraTrees, rf: RandomForest) surrogate'ı ile EI tabanlı minimizasyon.
+    bounds: [(lo, hi, is_int), ...]; x0 (warm start) rastgele başlangıç noktalarından önce değerlendirilir. Model her refit_every değerlendirmede bir yeniden fit edilir;
+    her fit'ten sonra EI'ye göre en iyi max(refit_every, batch_size) aday batch'ler halinde
+    objective_batch(list[tuple]) -> list[float] ile değerlendirilir. Fit maliyeti ~ n log n (GP: n^3).
+    """
+    if surrogate not in ("et", "rf"):
+        raise ValueError(f"surrogate must be 'et' or 'rf', got {surrogate!r}")
+    from scipy.stats import norm
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+
+    rng = np.random.default_rng(seed)
+    lo = np.array([b[0] for b in bounds], dtype=float)
+    hi = np.array([b[1] for b in bounds], dtype=float)
+    is_int = np.array([bool(b[2]) for b in bounds])
+    span = np.maximum(hi - lo, 1e-12)
+    d = len(bounds)
+
+    def to_x(u) -> tuple:
+        v = lo + np.clip(u, 0.0, 1.0) * span
+        return tuple(int(round(v[j])) if is_int[j] else float(v[j]) for j in range(d))
+
+    def to_u(x) -> np.ndarray:
+        return (np.asarray(x, dtype=float) - lo) / span
+
+    X: List[tuple] = []
+    Y: List[float] = []
+    seen = set()
+    n_fits = 0
+
+    def run(points):
+        points = [p for p in dict.fromkeys(points) if p not in seen][: n_calls - len(X)]
+        for i in range(0, len(points), max(1, batch_size)):
+            chunk = points[i:i + max(1, batch_size)]
+            for p, y in zip(chunk, objective_batch(chunk)):
+                X.append(p); Y.append(float(y) if y == y else 1e18); seen.add(p)
+
+    run([to_x(to_u(x)) for x in (x0 or [])] + [to_x(u) for u in rng.random((max(1, min(n_initial_points, n_calls)), d))])
+    Model = RandomForestRegressor if surrogate == "rf" else ExtraTreesRegressor
+    stall = 0
+    while len(X) < n_calls and stall < 3:
+        U = np.array([to_u(x) for x in X]); y = np.array(Y)
+        model = Model(n_estimators=100, min_samples_leaf=2, n_jobs=1,
+                      random_state=int(rng.integers(1 << 31))).fit(U, y)
+        n_fits += 1
+
+        # aday havuzu: uniform + en iyi noktaların komşulukları
+        best_u = U[np.argsort(y)[:5]]
+        local = np.clip(np.repeat(best_u, n_candidates // 10, axis=0)
+                        + rng.normal(0.0, 0.05, (len(best_u) * (n_candidates // 10), d)), 0.0, 1.0)
+        cand = np.vstack([rng.random((n_candidates, d)), local])
+        per_tree = np.stack([t.predict(cand) for t in model.estimators_])
+        mu, sigma = per_tree.mean(axis=0), per_tree.std(axis=0) + 1e-12
+        z = (y.min() - mu - xi) / sigma
+        ei = (y.min() - mu - xi) * norm.cdf(z) + sigma * norm.pdf(z)
+
+        k = max(1, int(refit_every), int(batch_size))
+        picks = []
+        for i in np.argsort(-ei):
+            x = to_x(cand[i])
+            if x not in seen and x not in picks:
+                picks.append(x)
+                if len(picks) >= k:
+                    break
+        before = len(X)
+        run(picks)
+        stall = stall + 1 if len(X) == before else 0
+
+    i = int(np.argmin(Y))
+    return {"x": list(X[i]), "fun": Y[i], "x_iters": X, "func_vals": Y, "n_fits": n_fits}
+
+
+# ---- multi-fidelity (successive halving / hyperband) yardımcıları
+def halving_rungs(min_fraction: float = 0.2, eta: float = 3.0) -> List[float]:
+    """Kronolojik prefix oranları: min_fraction, ×eta, ... , 1.0 (son rung tam veri)."""
+    f = min(1.0, max(1e-3, float(min_fraction)))
+    eta = max(1.5, float(eta))
+    out = []
+    while f < 1.0 - 1e-9:
+        out.append(f)
+        f *= eta
+    return out + [1.0]
+
+def successive_halving(cands: List[Any], rungs: List[float], eta: float, score_fn, start: int = 0) -> List[Any]:
+    """
+    cands'i rungs[start:-1] prefix'lerinde skorla (büyük = iyi), her rung'da en iyi 1/eta'yı terfi ettir.
+    score_fn(cands, frac) -> skor listesi (batch). Dönüş: tam veriye çıkacak adaylar.
+    """
+    survivors = list(cands)
+    for frac in rungs[start:-1]:
+        if len(survivors) <= 1:
+            break
+        scores = score_fn(survivors, frac)
+        keep = max(1, int(math.ceil(len(survivors) / float(eta))))
+        order = sorted(range(len(survivors)), key=lambda i: -scores[i])  # stable
+        survivors = [survivors[i] for i in order[:keep]]
+    return survivors
+
+def hyperband_brackets(n_rungs: int, eta: float, max_configs: Optional[int] = None) -> List[tuple]:
+    """
+    Hyperband bracket planı: [(n_configs, start_rung), ...], en agresif bracket önce.
+    max_configs verilirse bracket boyları toplam bu sayıya ölçeklenir.
+    """
+    s_max = max(0, int(n_rungs) - 1)
+    out = []
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * (eta ** s)))
+        out.append((n, s_max - s))
+    if max_configs:
+        tot = sum(n for n, _ in out)
+        out = [(max(1, int(round(n * max_configs / tot))), r) for n, r in out]
+    return out
+
+
+# ---- yerleşik batch evrimsel motor (GA / DE), optimize_space grid'ine saygılı
+def space_axes(optimize_space: Dict[str, Any]) -> List[Any]:
+    """Her boyut için ya değer listesi (list / min-max-step grid) ya da (lo, hi) sürekli aralık."""
+    axes = []
+    for o in optimize_space.values():
+        if "list" in o:
+            axes.append(list(o["list"]))
+        elif float(o.get("step", 0) or 0) > 0:
+            axes.append(grid_values(float(o["min"]), float(o["max"]), float(o["step"])))
+        else:
+            axes.append((float(o["min"]), float(o["max"])))
+    return axes
+
+def warm_points(optimize_space: Dict[str, Any], stored: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    Önceki koşuların parametre dict'lerini güncel uzaya taşır: eksik anahtarlı olanlar atlanır,
+    değerler [min, max]'a kırpılır ve step'e / listedeki en yakın değere yuvarlanır. Sıra korunur, tekrarlar atılır.
+    """
+    keys = list(optimize_space.keys())
+    out = []
+    for p in stored:
+        if not isinstance(p, dict) or any(p.get(k) is None for k in keys):
+            continue
+        vals = []
+        for k, ax in zip(keys, space_axes(optimize_space)):
+            v = float(p[k])
+            if isinstance(ax, list):
+                vals.append(min(ax, key=lambda x: abs(float(x) - v)))
+            else:
+                vals.append(min(max(v, ax[0]), ax[1]))
+        out.append(tuple(vals))
+    return list(dict.fromkeys(out))
+
+def evolve_grid(axes: List[Any], score_batch, pop_size: int = 24, generations: int = 30,
+                strategy: str = "ga", mutation: float = 0.2, crossover: float = 0.7, elite: int = 2,
+                de_f: float = 0.6, de_cr: float = 0.9, patience: int = 8, tol: float = 1e-9,
+                seed: Optional[int] = None, init: Optional[List[tuple]] = None) -> Dict[str, Any]:
+    """
+    Genom = grid indeksi (ayrık boyut) veya değer (sürekli boyut); çözümde en yakın grid değerine yuvarlanır.
+    Her nesil tek batch halinde score_batch(list[tuple]) -> list[float] ile skorlanır (büyük = iyi).
+    Nesil içi tekrar eden bireyler yeniden üretilir, önceki nesillerde skorlananlar tekrar skorlanmaz.
+    patience nesil boyunca en iyi skor tol kadar iyileşmezse erken durulur.
+    """
+    rng = np.random.default_rng(seed)
+    # DE: hedef + 3 farklı birey; GA: elitlerin dışında en az bir çift yavru
+    pop_size = max(4 if strategy == "de" else max(0, int(elite)) + 2, int(pop_size))
+    d = len(axes)
+    lo = np.array([0.0 if isinstance(a, list) else a[0] for a in axes])
+    hi = np.array([float(len(a) - 1) if isinstance(a, list) else a[1] for a in axes])
+    disc = np.array([isinstance(a, list) for a in axes], dtype=bool)
+    span = np.maximum(hi - lo, 1e-12)
+
+    def decode(g) -> tuple:
+        return tuple(axes[j][int(round(g[j]))] if disc[j] else float(g[j]) for j in range(d))
+
+    def encode(vals) -> np.ndarray:
+        g = np.empty(d)
+        for j, v in enumerate(vals):
+            g[j] = int(np.argmin([abs(float(x) - float(v)) for x in axes[j]])) if disc[j] else float(v)
+        return g
+
+    def random_genome() -> np.ndarray:
+        g = lo + rng.random(d) * span
+        g[disc] = np.round(g[disc])
+        return g
+
+    scores: Dict[tuple, float] = {}
+
+    def score_all(genomes) -> np.ndarray:
+        keys = [decode(g) for g in genomes]
+        new = list(dict.fromkeys(k for k in keys if k not in scores))
+        if new:
+            for k, v in zip(new, score_batch(new)):
+                scores[k] = float(v) if v == v else -np.inf
+        return np.array([scores[k] for k in keys])
+
+    def unique_fill(cands, make) -> List[np.ndarray]:
+        # nesil içi dedup: aynı grid noktasına düşen birey yerine yenisi üretilir
+        out, seen = [], set()
+        for g in cands:
+            tries = 0
+            while decode(g) in seen and tries < 10:
+                g = make(); tries += 1
+            seen.add(decode(g)); out.append(g)
+        return out
+
+    pop = [encode(v) for v in (init or [])][:pop_size]
+    pop += [random_genome() for _ in range(pop_size - len(pop))]
+    pop = unique_fill(pop, random_genome)
+    fit = score_all(pop)
+    best_hist = [float(fit.max())]
+    stale, stopped, gen = 0, False, 0
+
+    for gen in range(1, int(generations) + 1):
+        if strategy == "de":
+            trials = []
+            for i in range(len(pop)):
+                a, b, c = rng.choice([k for k in range(len(pop)) if k != i], size=3, replace=False)
+                mutant = np.clip(pop[a] + de_f * (pop[b] - pop[c]), lo, hi)
+                cross = rng.random(d) < de_cr
+                cross[rng.integers(d)] = True
+                t = np.where(cross, mutant, pop[i])
+                t[disc] = np.round(t[disc])
+                trials.append(t)
+            trials = unique_fill(trials, random_genome)
+            tfit = score_all(trials)
+            for i in range(len(pop)):
+                if tfit[i] >= fit[i]:
+                    pop[i], fit[i] = trials[i], tfit[i]
+        else:
+            order = np.argsort(-fit, kind="stable")
+            children = [pop[i].copy() for i in order[:max(0, int(elite))]]
+
+            def pick():
+                idx = rng.choice(len(pop), size=min(3, len(pop)), replace=False)
+                return pop[idx[np.argmax(fit[idx])]]
+
+            def child():
+                p1, p2 = pick(), pick()
+                c = np.where(rng.random(d) < 0.5, p1, p2) if rng.random() < crossover else p1.copy()
+                m = rng.random(d) < mutation
+                if m.any():
+                    step = rng.normal(0.0, 0.15, d) * span
+                    step[disc] = np.where(rng.random(d) < 0.5, -1, 1)[disc] * np.maximum(1, np.round(np.abs(step[disc])))
+                    c = np.where(m, np.clip(c + step, lo, hi), c)
+                c[disc] = np.round(c[disc])
+                return c
+
+            children += [child() for _ in range(pop_size - len(children))]
+            pop = unique_fill(children, child)
+            fit = score_all(pop)
+
+        best_hist.append(float(fit.max()))
+        if best_hist[-1] > max(best_hist[:-1]) + tol:
+            stale = 0
+        else:
+            stale += 1
+            if patience and stale >= patience:
+                stopped = True
+                break
+
+    best_key = max(scores, key=scores.get)
+    return {"best": best_key, "best_score": scores[best_key], "generations": gen, "history": best_hist,
+            "stopped_early": stopped, "evaluated": len(scores), "population": [decode(g) for g in pop]}
+
+
+# ---- coarse-to-fine adaptif grid
+def adaptive_grid_search(sizes: List[int], score_batch, coarse_points: int = 5, top_n: int = 5,
+                         max_neighbours: int = 64, max_evals: Optional[int] = None,
+                         seed: Optional[int] = None, coarse_fraction: float = 0.5,
+                         max_coarse: int = 2048) -> Dict[str, Any]:
+    """
+    sizes: her boyutun ince grid uzunluğu. Önce boyut başına ~coarse_points noktalı eşit aralıklı
+    kaba kafes değerlendirilir; kafes bütçenin coarse_fraction'ına (bütçe yoksa max_coarse noktaya)
+    sığana kadar boyut başına nokta azaltılır, 2 noktada bile sığmazsa eşit olasılıkla alt örneklenir —
+    inceltme turlarına her zaman bütçe kalır. Sonra adım her turda yarıya inerek en iyi top_n noktanın
+    komşulukları (±adım) deklare edilen step'e (indeks adımı 1) kadar inceltilir.
+    3^d komşu max_neighbours'u aşarsa eksen komşuları + rastgele alt küme alınır.
+    score_batch(list[index tuple]) -> list[float] (büyük = iyi). Değerlendirilmiş noktalar tekrar skorlanmaz.
+    """
+    rng = random.Random(seed)
+    d = len(sizes)
+    scores: Dict[tuple, float] = {}
+
+    def budget_left() -> int:
+        return (max_evals - len(scores)) if max_evals else 1 << 60
+
+    def score(points) -> None:
+        new = [p for p in dict.fromkeys(points) if p not in scores][:max(0, budget_left())]
+        if new:
+            for p, v in zip(new, score_batch(new)):
+                scores[p] = float(v) if v == v else -np.inf
+
+    cap = max(1, int(max_evals * coarse_fraction) if max_evals else int(max_coarse))
+    k = max(2, int(coarse_points))
+    while True:
+        strides = [max(1, int(math.ceil((n - 1) / (k - 1)))) if n > 1 else 1 for n in sizes]
+        lattice = [sorted(set(list(range(0, n, st)) + [n - 1])) for n, st in zip(sizes, strides)]
+        total = math.prod(len(ax) for ax in lattice)
+        if total <= cap or k == 2:
+            break
+        k -= 1
+    if total <= cap:
+        score(list(itertools.product(*lattice)))
+    else:
+        # karışık tabanlı indeks -> kafes noktası; sözlük sırasıyla kesmek ilk eksenleri dondururdu
+        def _point(flat):
+            p = []
+            for ax in reversed(lattice):
+                flat, r = divmod(flat, len(ax))
+                p.append(ax[r])
+            return tuple(reversed(p))
+        score([_point(f) for f in rng.sample(range(total), cap)])
+    rounds = 0
+
+    while budget_left() > 0:
+        strides = [max(1, st // 2) for st in strides]
+        best_before = max(scores.values()) if scores else -np.inf
+        n_before = len(scores)
+        top = sorted(scores, key=scores.get, reverse=True)[:max(1, int(top_n))]
+        batch = []
+        for c in top:
+            offs = [(-st, 0, st) if n > 1 else (0,) for n, st in zip(sizes, strides)]
+            combos = list(itertools.product(*offs))
+            if len(combos) > max_neighbours:
+                axis = [tuple(o if j == i else 0 for j in range(d)) for i in range(d) for o in (-strides[i], strides[i])]
+                combos = axis + rng.sample(combos, max(0, max_neighbours - len(axis)))
+            for off in combos:
+                p = tuple(min(n - 1, max(0, c[j] + off[j])) for j, n in enumerate(sizes))
+                if p not in scores:
+                    batch.append(p)
+        score(batch)
+        rounds += 1
+        if all(st == 1 for st in strides) and (len(scores) == n_before or max(scores.values()) <= best_before):
+            break
+
+    best = max(scores, key=scores.get)
+    return {"best": best, "best_score": scores[best], "evaluated": len(scores), "rounds": rounds}
+
+
 # Önce OptimizeReq modelini güncelleyin
 # Önce OptimizeReq modelini güncelleyin
 class OptimizeReq(BaseModel):
@@ -3124,6 +4167,7 @@ class OptimizeReq(BaseModel):
 @app.post("/optimize/core")
 def optimize_core(req: OptimizeReq):
     t0 = time.time()
+    pool = None
     try:
         sid = getattr(req, "data_snapshot_id", None)
         if not sid or sid not in SNAPSHOT_STORE:
@@ -3139,180 +4183,463 @@ def optimize_core(req: OptimizeReq):
         print(f"Running optimization with method: {method}")
         print(f"Method params: {method_params}")
 
-        memoization_cache = {}
+        # İstek içi memo (sınırlı LRU, sadece stats) + kalıcı EVAL_CACHE (istekler/WFO arası).
+        # Sonuçlar TopKCollector'da akar: grid boyundan bağımsız sabit bellek.
+        from collections import OrderedDict
+        memoization_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        memo_max = int(method_params.get("memo_size", 50000))
+        top_k = int(method_params.get("top_k", 200))
+        sample_n = int(method_params.get("sample", 0) or 0)
+        collector = TopKCollector(k=top_k, reservoir=sample_n, seed=method_params.get("seed"))
+        n_evaluated = 0
+        budget = EvalBudget.from_params(method_params, t0=t0)
+        sch = req.exit_scheme or ExitSchemeEvt(type="fixed", tp_pct=req.tp, sl_pct=req.sl)
+        key_base = {
+            "kind": "scheme", "data": snapshot_fingerprint(sid), "symbol": req.symbol,
+            "timeframe": req.timeframe, "expr": req.expr, "expr_params": req.params or {},
+            "indicators": req.indicators or {}, "side": req.side, "leverage": req.leverage,
+            "exit": sch, "fee_pct": req.fee_pct, "slippage_pct": req.slippage_pct,
+            "version": EVAL_CACHE_VERSION,
+        }
+        # Warm start: aynı strateji (veri aralığı / sınırlar hariç) için önceki koşuların en iyileri
+        warm_fp = strategy_fingerprint("core", symbol=req.symbol, timeframe=req.timeframe, expr=req.expr,
+                                       side=req.side, exit=sch.type, params=sorted(optimize_space.keys()))
+        warm = (warm_points(optimize_space, WARM_START.best(warm_fp, int(method_params.get("warm_n", 10))))
+                if method_params.get("warm_start") else [])
+        if warm:
+            print(f"Warm start: {len(warm)} seed point(s) from previous runs.")
+        pool = WorkerPool({"df": base_df, "req": req, "sch": sch}, n_jobs=method_params.get("n_jobs"))
+        batch_size = max(1, int(method_params.get("batch_size") or pool.jobs))
+
+        def _stats_many(params_list, n_rows=None) -> List[Dict[str, Any]]:
+            # EVAL_CACHE isabetleri hariç kalanlar worker havuzunda tek batch olarak simüle edilir,
+            # stats'ları ragged (aday x trade) batch çekirdeğinde tek çağrıyla hesaplanır
+            ekeys = [eval_cache_key(params=p, **key_base) if n_rows is None
+                     else eval_cache_key(params=p, prefix=n_rows, **key_base) for p in params_list]
+            out = [EVAL_CACHE.get(k) for k in ekeys]
+            miss = {}
+            for i, (k, st) in enumerate(zip(ekeys, out)):
+                if st is None:
+                    miss.setdefault(k, []).append(i)
+            if miss:
+                if budget.seconds_left() is not None:
+                    budget.check()
+                firsts = [idx[0] for idx in miss.values()]
+                fresh = stats_from_trades_batch(pool.map(_core_pnl, [(params_list[i], n_rows) for i in firsts]))
+                for (k, idx), st in zip(miss.items(), fresh):
+                    EVAL_CACHE.put(k, st)
+                    for i in idx:
+                        out[i] = st
+            return out
+
+        def evaluate_many(param_tuples) -> List[tuple]:
+            nonlocal n_evaluated
+            keys = list(optimize_space.keys())
+            params_list = [dict(zip(keys, t)) for t in param_tuples]
+            cache_keys = [tuple(sorted(p.items())) for p in params_list]
+            todo = {}
+            for ck, p in zip(cache_keys, params_list):
+                if ck not in memoization_cache and ck not in todo:
+                    todo[ck] = p
+            cut = False
+            if todo:
+                budget.check(n_evaluated)
+                allowed = budget.evals_left(n_evaluated)
+                if len(todo) > allowed:  # batch bütçeye sığacak kadar kırpılır
+                    todo, cut = dict(itertools.islice(todo.items(), allowed)), True
+                n_evaluated += len(todo)
+                for (ck, p), stats in zip(todo.items(), _stats_many(list(todo.values()))):
+                    result = (-stats.get("profit", -1e9), stats, p)
+                    memoization_cache[ck] = result
+                    collector.push(stats.get("profit", -1e9), {"params": p, "stats": stats, **stats}, key=ck)
+            if cut:
+                budget.hit = True
+                raise BudgetExhausted()
+            results = []
+            for ck in cache_keys:
+                memoization_cache.move_to_end(ck)
+                results.append(memoization_cache[ck])
+            while len(memoization_cache) > max(memo_max, len(cache_keys)):
+                memoization_cache.popitem(last=False)
+            return results
+
         def evaluate_candidate(params_tuple):
-            params = dict(zip(optimize_space.keys(), params_tuple))
-            cache_key = tuple(sorted(params.items()))
-            if cache_key in memoization_cache:
-                return memoization_cache[cache_key]
+            return evaluate_many([params_tuple])[0]
 
-            ind_over = {**(req.indicators or {}), **params}
-            df = compute_indicators(base_df, timeframe=req.timeframe, **ind_over)
-            
-            ent_signed = expr_to_entries(df, req.expr, req.params or {}, side=req.side, respect_expr_sign=True)
-            sgn_series = pd.Series(np.sign(ent_signed).astype(int), index=df.index)
-            entries_mask = sgn_series != 0
-            
-            sch = req.exit_scheme or ExitSchemeEvt(type="fixed", tp_pct=req.tp, sl_pct=req.sl)
-            trades = simulate_scheme_over_entries(
-                df, req.symbol, entries_mask, req.side, req.leverage, sch,
-                sgn_series=sgn_series, fee_pct=req.fee_pct, slippage_pct=req.slippage_pct
-            )
-            stats = stats_from_trades_basic(trades)
-            
-            objective_score = -stats.get("profit", -1e9)
-            
-            result = (objective_score, stats, trades, params)
-            memoization_cache[cache_key] = result
-            return result
+        def evaluate_prefix_many(params_list, frac: float) -> List[Dict[str, Any]]:
+            # kronolojik prefix üzerinde düşük-fidelity değerlendirme (cache'li)
+            return _stats_many(params_list, n_rows=max(2, int(len(base_df) * float(frac))))
+
+        def evaluate_prefix(params, frac: float) -> Dict[str, Any]:
+            return evaluate_prefix_many([params], frac)[0]
+
+        def simulate_candidate(params):
+            return _core_simulate(pool.ctx, params)
 
-        results = []
         best_result_obj = None
+        study_info = None
+        rung_info = None
 
-        if method in ["grid", "random"]:
-            # Parametreleri method_params'tan oku
-            if method == "grid":
-                max_iter = int(method_params.get("max_iterations", 1000))
-                space_iter = iter_param_space(optimize_space, limit=max_iter)
-            else:  # random
-                samples = int(method_params.get("samples", 1000))
-                space_iter = random_space(optimize_space, samples=samples)
+        # Tüm yöntemler aynı bütçeyi (max_seconds / max_evals) paylaşır; bütçe bitince
+        # en iyi-şimdiye-kadar sonuç truncated=True ile döner.
+        truncated = False
+        try:
+            if method in ["grid", "random"]:
+                # Parametreleri method_params'tan oku
+                if method == "grid":
+                    max_iter = int(method_params.get("max_iterations", 1000))
+                    space_iter = iter_param_space(optimize_space, limit=max_iter)
+                else:  # random
+                    samples = int(method_params.get("samples", 1000))
+                    space_iter = random_space(optimize_space, samples=samples)
                 
-            for cand_params in space_iter:
-                param_tuple = tuple(cand_params.get(k) for k in optimize_space.keys())
-                _, stats, _, evaluated_params = evaluate_candidate(param_tuple)
-                results.append({"params": evaluated_params, "stats": stats, **stats})
-            
-            if results:
-                results.sort(key=lambda r: r.get("profit", -1e9), reverse=True)
-                best_params_from_sort = results[0]['params']
-                param_tuple_best = tuple(best_params_from_sort.get(k) for k in optimize_space.keys())
-                _, best_stats, _, _ = evaluate_candidate(param_tuple_best)
-                best_result_obj = {"params": best_params_from_sort, "stats": best_stats, **best_stats}
-        
-        else:
-            # Önce tüm gerekli import'ları yap
-
-            # Parameter space oluştur (artık Integer ve Real kullanılabilir)
-            varbound, space_dims = [], []
-            for k, v in optimize_space.items():
-                low, high, step = v['min'], v['max'], v.get('step', 0)
-                varbound.append([low, high])
-
-                is_integer_space = (
-                    float(low).is_integer() and
-                    float(high).is_integer() and
-                    (step == 0 or float(step).is_integer())
+                # sabit boyutlu batch'ler halinde (paralel) değerlendir
+                chunk = batch_size * 8
+                for batch in iter(lambda: list(itertools.islice(space_iter, chunk)), []):
+                    evaluate_many([tuple(c.get(k) for k in optimize_space.keys()) for c in batch])
+
+                top = collector.items()
+                if top:
+                    best_result_obj = dict(top[0])
+
+            elif method in ["halving", "hyperband"]:
+                # Adaylar büyüyen kronolojik prefix'lerde skorlanır; her rung'da en iyi 1/eta terfi eder.
+                eta = float(method_params.get("eta", 3))
+                rungs = halving_rungs(float(method_params.get("min_fraction", 0.2)), eta)
+                rung_info = rungs
+                keys = list(optimize_space.keys())
+
+                def rung_scores(cands, frac):
+                    return [st.get("profit", -1e9) for st in evaluate_prefix_many(cands, frac)]
+
+                if method == "halving":
+                    if method_params.get("samples"):
+                        cands0 = list(random_space(optimize_space, samples=int(method_params["samples"])))
+                    else:
+                        cands0 = list(iter_param_space(optimize_space, limit=int(method_params.get("max_iterations", 1000))))
+                    plan = [(cands0, 0)]
+                else:
+                    n_max = method_params.get("samples")
+                    plan = [(list(random_space(optimize_space, samples=n)), r)
+                            for n, r in hyperband_brackets(len(rungs), eta, int(n_max) if n_max else None)]
+
+                for cands, start in plan:
+                    final = successive_halving(cands, rungs, eta, rung_scores, start=start)
+                    evaluate_many([tuple(c.get(k) for k in keys) for c in final])
+
+                top = collector.items()
+                if top:
+                    best_result_obj = dict(top[0])
+
+            elif method == "adaptive_grid":
+                # kaba kafes -> en iyi hücrelerin komşuluklarını step'e kadar incelt (cache'li, batch'li)
+                cont_n = int(method_params.get("continuous_points", 33))
+                axes = [a if isinstance(a, list) else list(np.linspace(a[0], a[1], cont_n))
+                        for a in space_axes(optimize_space)]
+                ag = adaptive_grid_search(
+                    [len(a) for a in axes],
+                    lambda idxs: [-r[0] for r in evaluate_many([tuple(axes[j][i] for j, i in enumerate(ix)) for ix in idxs])],
+                    coarse_points=int(method_params.get("coarse_points", 5)),
+                    top_n=int(method_params.get("top_n", 5)),
+                    max_neighbours=int(method_params.get("max_neighbours", 64)),
+                    max_evals=int(method_params["max_iterations"]) if method_params.get("max_iterations") else None,
+                    seed=method_params.get("seed"),
                 )
+                _, best_stats, best_params_dict = evaluate_candidate(tuple(axes[j][i] for j, i in enumerate(ag["best"])))
+                best_result_obj = {"params": best_params_dict, "stats": best_stats, **best_stats}
 
-                if is_integer_space:
-                     space_dims.append(Integer(int(low), int(high), name=k))
-                else:
-                     space_dims.append(Real(low, high, name=k))
+            elif method == "evolution":
+                # Yerleşik GA/DE: min/max/step grid'inde, her nesil tek paralel batch
+                print(f"Starting native evolution ({method_params.get('strategy', 'ga')})...")
+                evo = evolve_grid(
+                    space_axes(optimize_space),
+                    lambda ts: [-r[0] for r in evaluate_many(ts)],
+                    pop_size=int(method_params.get("population_size", 24)),
+                    generations=int(method_params.get("generations", 30)),
+                    strategy=str(method_params.get("strategy", "ga")).lower(),
+                    mutation=float(method_params.get("mutation_probability", 0.2)),
+                    crossover=float(method_params.get("crossover_probability", 0.7)),
+                    elite=int(method_params.get("elite", 2)),
+                    de_f=float(method_params.get("de_f", 0.6)),
+                    de_cr=float(method_params.get("de_cr", 0.9)),
+                    patience=int(method_params.get("patience", 8)),
+                    seed=method_params.get("seed"),
+                    init=warm,
+                )
+                _, best_stats, best_params_dict = evaluate_candidate(evo["best"])
+                best_result_obj = {"params": best_params_dict, "stats": best_stats, **best_stats}
+                print(f"Evolution finished after {evo['generations']} generations (early stop: {evo['stopped_early']}).")
+
+            else:
+                # Önce tüm gerekli import'ları yap
+
+                # Parameter space oluştur (artık Integer ve Real kullanılabilir)
+                varbound, space_dims = [], []
+                for k, v in optimize_space.items():
+                    low, high, step = v['min'], v['max'], v.get('step', 0)
+                    varbound.append([low, high])
+
+                    is_integer_space = (
+                        float(low).is_integer() and
+                        float(high).is_integer() and
+                        (step == 0 or float(step).is_integer())
+                    )
+
+                    if is_integer_space:
+                         space_dims.append(Integer(int(low), int(high), name=k))
+                    else:
+                         space_dims.append(Real(low, high, name=k))
             
-            def objective_func(p): 
-                return evaluate_candidate(tuple(p))[0]
+                def objective_func(p): 
+                    return evaluate_candidate(tuple(p))[0]
 
-            best_params_tuple = None
+                best_params_tuple = None
             
-            if method == "bayesian":
-                print("Starting Bayesian Optimization...")
-                n_calls = int(method_params.get("n_calls", 150))
-                n_initial_points = int(method_params.get("n_initial_points", 10))
+                if method == "bayesian":
+                    print("Starting Bayesian Optimization...")
+                    n_calls = int(method_params.get("n_calls", 150))
+                    n_initial_points = int(method_params.get("n_initial_points", 10))
                 
-                res = gp_minimize(
-                    func=objective_func, 
-                    dimensions=space_dims, 
-                    n_calls=n_calls, 
-                    n_initial_points=n_initial_points,
-                    random_state=42
-                )
-                best_params_tuple = tuple(res.x)
-                print(f"Bayesian completed. Best score: {-res.fun}")
+                    surrogate = surrogate_kind(method_params)
+                    if surrogate != "gp":
+                        # ağaç topluluğu surrogate: refit_every değerlendirmede bir fit, batch'ler havuzda
+                        bounds = [(d.low, d.high, isinstance(d, Integer)) for d in space_dims]
+                        sr = surrogate_minimize(
+                            lambda xs: [r[0] for r in evaluate_many(xs)], bounds,
+                            n_calls=n_calls, n_initial_points=n_initial_points, surrogate=surrogate,
+                            refit_every=int(method_params.get("refit_every", max(5, batch_size))), batch_size=batch_size,
+                            seed=method_params.get("seed", 42), x0=warm,
+                        )
+                        res = SimpleNamespace(x=sr["x"], fun=sr["fun"])
+                    elif batch_size <= 1:
+                        res = gp_minimize(
+                            func=objective_func, 
+                            dimensions=space_dims, 
+                            n_calls=n_calls, 
+                            n_initial_points=max(0, min(n_initial_points, n_calls - len(warm[:n_calls]))),
+                            x0=[list(x) for x in warm[:n_calls]] or None,
+                            random_state=42
+                        )
+                    else:
+                        # batch ask/tell: constant-liar ile q aday öner, havuzda değerlendir, geri bildir
+                        opt = SkOptimizer(space_dims, base_estimator="GP", n_initial_points=n_initial_points,
+                                          acq_func="gp_hedge", random_state=42)
+                        done = 0
+                        if warm:
+                            xs = [list(x) for x in warm[:n_calls]]
+                            res = opt.tell(xs, [r[0] for r in evaluate_many([tuple(x) for x in xs])])
+                            done += len(xs)
+                        while done < n_calls:
+                            q = min(batch_size, n_calls - done)
+                            xs = opt.ask(n_points=q, strategy=method_params.get("liar", "cl_min"))
+                            ys = [r[0] for r in evaluate_many([tuple(x) for x in xs])]
+                            res = opt.tell(xs, ys)
+                            done += q
+                    best_params_tuple = tuple(res.x)
+                    print(f"Bayesian completed. Best score: {-res.fun}")
             
-            elif method == "genetic":
-                print("Starting Genetic Algorithm...")
-                ga_params = {
-                    'max_num_iteration': int(method_params.get("max_num_iteration", 100)),
-                    'population_size': int(method_params.get("population_size", 20)),
-                    'mutation_probability': float(method_params.get("mutation_probability", 0.1)),
-                    'elit_ratio': float(method_params.get("elit_ratio", 0.01)),
-                    'parents_portion': 0.3,
-                    'crossover_probability': 0.5,
-                    'crossover_type': 'uniform',
-                    'max_iteration_without_improv': 10
-                }
+                elif method == "genetic":
+                    print("Starting Genetic Algorithm...")
+                    ga_params = {
+                        'max_num_iteration': int(method_params.get("max_num_iteration", 100)),
+                        'population_size': int(method_params.get("population_size", 20)),
+                        'mutation_probability': float(method_params.get("mutation_probability", 0.1)),
+                        'elit_ratio': float(method_params.get("elit_ratio", 0.01)),
+                        'parents_portion': 0.3,
+                        'crossover_probability': 0.5,
+                        'crossover_type': 'uniform',
+                        'max_iteration_without_improv': 10
+                    }
                 
-                model = ga(
-                    function=objective_func, 
-                    dimension=len(varbound), 
-                    variable_type='real', 
-                    variable_boundaries=np.array(varbound), 
-                    algorithm_parameters=ga_params
-                )
-                model.run()
-                best_params_tuple = tuple(model.best_variable)
-
-            elif method in ["tpe", "cmaes"]:
-                print(f"Starting Optuna {method.upper()}...")
-                n_trials = int(method_params.get("n_trials", 200))
-                n_startup_trials = int(method_params.get("n_startup_trials", 10))
+                    model = ga(
+                        function=objective_func, 
+                        dimension=len(varbound), 
+                        variable_type='real', 
+                        variable_boundaries=np.array(varbound), 
+                        algorithm_parameters=ga_params
+                    )
+                    model.run()
+                    best_params_tuple = tuple(model.best_variable)
+
+                elif method in ["tpe", "cmaes"]:
+                    print(f"Starting Optuna {method.upper()}...")
+                    n_trials = int(method_params.get("n_trials", 200))
+                    n_startup_trials = int(method_params.get("n_startup_trials", 10))
                 
-                optuna.logging.set_verbosity(optuna.logging.WARNING)
+                    optuna.logging.set_verbosity(optuna.logging.WARNING)
                 
-                if method == "tpe":
-                    sampler = optuna.samplers.TPESampler(n_startup_trials=n_startup_trials)
-                else: # cmaes
-                    sampler = optuna.samplers.CmaEsSampler()
-
-                study = optuna.create_study(direction="minimize", sampler=sampler)
+                    def make_sampler():
+                        if method == "tpe":
+                            return optuna.samplers.TPESampler(n_startup_trials=n_startup_trials)
+                        # cmaes: warm start varsa dağılım önceki en iyi noktadan başlar
+                        return optuna.samplers.CmaEsSampler(x0=dict(zip(optimize_space.keys(), warm[0])) if warm else None)
+
+                    # Opsiyonel pruner: trial'lar kronolojik prefix'lerde ara rapor verir
+                    pruner_name = (method_params.get("pruner") or "").lower()
+                    eta = float(method_params.get("eta", 3))
+                    if pruner_name in ("sha", "hyperband") and (eta != int(eta) or eta < 2):
+                        # optuna reduction_factor tamsayı; rung'lar da aynı eta ile kurulmalı
+                        raise HTTPException(status_code=422, detail="eta must be an integer >= 2 for sha/hyperband pruners.")
+                    rungs = halving_rungs(float(method_params.get("min_fraction", 0.2)), eta)
+                    pruner = {
+                        "median": lambda: optuna.pruners.MedianPruner(n_startup_trials=n_startup_trials),
+                        "sha": lambda: optuna.pruners.SuccessiveHalvingPruner(reduction_factor=int(eta)),
+                        "hyperband": lambda: optuna.pruners.HyperbandPruner(min_resource=1, max_resource=len(rungs), reduction_factor=int(eta)),
+                    }.get(pruner_name, lambda: None)()
+
+                    # Kalıcı çalışma: strateji parmak izi (veri, expr, maliyet, şema, arama uzayı, yöntem)
+                    storage_kind = optuna_storage_kind(method_params)
+                    fingerprint = "core-" + eval_cache_key(space=optimize_space, method=method, **key_base)[:16]
+                    study = open_optuna_study(fingerprint, "minimize", make_sampler(), pruner,
+                                              storage_kind=storage_kind, resume=bool(method_params.get("resume")))
                 
-                def optuna_objective(trial):
-                    p = []
-                    for k in optimize_space.keys():
-                        v = optimize_space[k]
-                        step = v.get('step')
-                        if float(v['min']).is_integer() and float(v['max']).is_integer() and step and float(step).is_integer():
-                             p.append(trial.suggest_int(k, v['min'], v['max'], step=int(step)))
-                        else:
-                             p.append(trial.suggest_float(k, v['min'], v['max'], step=step))
-                    return objective_func(tuple(p))
-
-                study.optimize(optuna_objective, n_trials=n_trials)
-                best_params_tuple = tuple(study.best_params.get(k) for k in optimize_space.keys())
+                    def suggest(trial):
+                        p = []
+                        for k in optimize_space.keys():
+                            v = optimize_space[k]
+                            step = v.get('step')
+                            if float(v['min']).is_integer() and float(v['max']).is_integer() and step and float(step).is_integer():
+                                 p.append(trial.suggest_int(k, v['min'], v['max'], step=int(step)))
+                            else:
+                                 p.append(trial.suggest_float(k, v['min'], v['max'], step=step))
+                        return p
+
+                    def optuna_objective(trial):
+                        p = suggest(trial)
+                        try:
+                            if pruner is not None:
+                                params = dict(zip(optimize_space.keys(), p))
+                                for step_i, frac in enumerate(rungs[:-1], start=1):
+                                    trial.report(-evaluate_prefix(params, frac).get("profit", -1e9), step_i)
+                                    if trial.should_prune():
+                                        raise optuna.TrialPruned()
+                            r = evaluate_candidate(tuple(p))
+                        except BudgetExhausted:
+                            # FAIL yerine: bu trial budanır, çalışma (worker'da da) temiz durur
+                            budget.hit = True
+                            trial.study.stop()
+                            raise optuna.TrialPruned()
+                        trial.set_user_attr("stats", r[1])  # worker süreçlerinden/geçmişten top listesine
+                        return r[0]
+
+                    def batch_runner(study):
+                        # batch ask/tell: q trial aç, (varsa) prefix rung'larında birlikte raporla/budama yap,
+                        # kalanları havuzda tam veride değerlendir ve tell et
+                        done = 0
+                        while done < n_trials:
+                            q = min(batch_size, n_trials - done)
+                            trials = [study.ask() for _ in range(q)]
+                            ps = [suggest(t) for t in trials]
+                            live = list(range(q))
+                            if pruner is not None:
+                                for step_i, frac in enumerate(rungs[:-1], start=1):
+                                    stats = evaluate_prefix_many([dict(zip(optimize_space.keys(), ps[i])) for i in live], frac)
+                                    keep = []
+                                    for i, st in zip(live, stats):
+                                        trials[i].report(-st.get("profit", -1e9), step_i)
+                                        if trials[i].should_prune():
+                                            study.tell(trials[i], state=optuna.trial.TrialState.PRUNED)
+                                        else:
+                                            keep.append(i)
+                                    live = keep
+                            for i, r in zip(live, evaluate_many([tuple(ps[i]) for i in live])):
+                                trials[i].set_user_attr("stats", r[1])
+                                study.tell(trials[i], r[0])
+                            done += q
+
+                    for x in warm:  # TPE geçmişi: önceki en iyiler ilk trial'lar olarak değerlendirilir
+                        study.enqueue_trial(dict(zip(optimize_space.keys(), x)), skip_if_exists=True)
+                    n_before = len(study.trials)
+                    try:
+                        run_optuna_study(study, optuna_objective, n_trials, make_sampler, pruner=pruner,
+                                         storage_kind=storage_kind, n_workers=int(method_params.get("n_workers", 1) or 1),
+                                         runner=batch_runner if batch_size > 1 else None,
+                                         timeout=budget.seconds_left(), budget=budget, used=lambda: n_evaluated)
+                    except BudgetExhausted:
+                        budget.hit = True  # tamamlanan trial'lar aşağıda yine toplanır
+                    if budget.seconds_left() == 0.0:
+                        budget.hit = True  # optuna timeout ile durdu
+
+                    # worker süreçlerinde ya da önceki (resume) oturumlarda tamamlanan trial'lar
+                    for t in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,)):
+                        st = t.user_attrs.get("stats")
+                        p = {k: t.params.get(k) for k in optimize_space.keys()}
+                        ck = tuple(sorted(p.items()))
+                        if st is not None and ck not in memoization_cache:
+                            n_evaluated += int(t.number >= n_before)
+                            memoization_cache[ck] = (-st.get("profit", -1e9), st, p)
+                            collector.push(st.get("profit", -1e9), {"params": p, "stats": st, **st}, key=ck)
+                    study_info = {"name": study.study_name, "trials": len(study.trials)}
+                    try:
+                        best_params_tuple = tuple(study.best_params.get(k) for k in optimize_space.keys())
+                    except ValueError:  # COMPLETE trial yok (hepsi budandı / süre doldu)
+                        top = collector.items()
+                        if top:
+                            best_result_obj = dict(top[0])
             
-            elif method == "annealing":
-                print("Starting Simulated Annealing...")
-                maxiter = int(method_params.get("maxiter", 1000))
-                initial_temp = float(method_params.get("initial_temp", 5230))
+                elif method == "annealing":
+                    print("Starting Simulated Annealing...")
+                    maxiter = int(method_params.get("maxiter", 1000))
+                    initial_temp = float(method_params.get("initial_temp", 5230))
                 
-                res = dual_annealing(
-                    func=objective_func, 
-                    bounds=varbound, 
-                    maxiter=maxiter, 
-                    initial_temp=initial_temp
-                )
-                best_params_tuple = tuple(res.x)
-
-            if best_params_tuple:
-                _, best_stats, _, best_params_dict = evaluate_candidate(best_params_tuple)
-                best_result_obj = {"params": best_params_dict, "stats": best_stats, **best_stats}
-                for _, stats, _, params in memoization_cache.values():
-                    results.append({"params": params, "stats": stats, **stats})
-                results.sort(key=lambda r: r.get("profit", -1e9), reverse=True)
-
-        return {
+                    res = dual_annealing(
+                        func=objective_func, 
+                        bounds=varbound, 
+                        maxiter=maxiter, 
+                        initial_temp=initial_temp,
+                        x0=np.array(warm[0], dtype=float) if warm else None
+                    )
+                    best_params_tuple = tuple(res.x)
+
+                if best_params_tuple:
+                    _, best_stats, best_params_dict = evaluate_candidate(best_params_tuple)
+                    best_result_obj = {"params": best_params_dict, "stats": best_stats, **best_stats}
+        except BudgetExhausted:
+            truncated = True
+        truncated = truncated or budget.hit
+        if best_result_obj is None or truncated:
+            top = collector.items()
+            if top and (best_result_obj is None or top[0]["profit"] > best_result_obj.get("profit", -1e18)):
+                best_result_obj = dict(top[0])
+
+        EVAL_CACHE.flush()
+        results = collector.items()
+        WARM_START.record(warm_fp, [(r.get("profit"), r["params"]) for r in results[:int(method_params.get("warm_keep", 20))]])
+
+        # Trade listeleri sadece final top-K için yeniden simüle edilir (istenirse)
+        n_trades_out = int(method_params.get("return_trades", 0) or 0)
+        if n_trades_out:
+            for row in ([best_result_obj] if best_result_obj else []) + results[:n_trades_out]:
+                row["trades"] = simulate_candidate(row["params"]).to_records()
+
+        out = {
             "best": best_result_obj,
-            "top": results[:200],
+            "top": results,
             "elapsed_sec": round(time.time() - t0, 4),
-            "evaluated": len(memoization_cache),
-            "method": method
+            "evaluated": n_evaluated,
+            "method": method,
+            "truncated": truncated,
         }
+        if sample_n:
+            out["sample"] = collector.sample()
+        if study_info:
+            out["study"] = study_info
+        if rung_info:
+            out["rungs"] = rung_info
+        if warm:
+            out["warm_start"] = len(warm)
+        return out
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"optimize/core failed: {type(e).__name__}: {e}")# -----------------------------------------------------------------------------
+        raise HTTPException(status_code=500, detail=f"optimize/core failed: {type(e).__name__}: {e}")
+    finally:
+        if pool is not None:
+            pool.close()
+# -----------------------------------------------------------------------------
 
 from dataclasses import dataclass
 import itertools
@@ -3366,12 +4693,15 @@ def _norm_to_actual(lo_n, hi_n, lo_a, hi_a):
     return float(lo), float(hi)
 
 def _eval_mask(df, intervals_n, bounds_a):
-    mask_pos = df["signal"] != 0
-    mask = mask_pos.copy()
+    """-> (mask, mask_pos) BitMask: aralık filtresi ∧ sinyal, ve sadece sinyal satırları."""
+    pos = df["signal"].to_numpy() != 0
+    mask_pos = BitMask.from_bool(pos)
+    mask = mask_pos
     for c, (lo_n, hi_n) in intervals_n.items():
         lo_a, hi_a = bounds_a[c]
         lo_v, hi_v = _norm_to_actual(lo_n, hi_n, lo_a, hi_a)
-        mask &= (df[c] >= lo_v) & (df[c] <= hi_v)
+        x = df[c].to_numpy()
+        mask = mask & BitMask.from_bool((x >= lo_v) & (x <= hi_v))
     return mask, mask_pos
 
 def _intervals_to_rules(intervals_n, bounds_a):
@@ -3388,20 +4718,40 @@ def _intervals_to_rules(intervals_n, bounds_a):
             rules.append(f"((data['{c}'] >= {lo_v:.6f}) & (data['{c}'] <= {hi_v:.6f}))")
     return rules
 
-def _calculate_real_stats_from_trades(trades: list) -> dict:
+def _intervals_to_mask(cols_a: Dict[str, np.ndarray], intervals_n, bounds_a) -> Optional[np.ndarray]:
+    """
+    _intervals_to_rules ile birebir aynı filtre, ifade metni yeniden değerlendirilmeden.
+    Eşikler kurallardaki gibi 6 haneye yuvarlanır. Kural yoksa None döner.
+    """
+    mask = None
+    for c, (lo_n, hi_n) in intervals_n.items():
+        if abs(lo_n - 0.0) < 1e-6 and abs(hi_n - 1.0) < 1e-6: continue
+        lo_a, hi_a = bounds_a[c]
+        lo_v, hi_v = _norm_to_actual(lo_n, hi_n, lo_a, hi_a)
+        lo_v, hi_v = float(f"{lo_v:.6f}"), float(f"{hi_v:.6f}")
+        x = cols_a[c]
+        if abs(hi_n - 1.0) < 1e-6 and lo_n > 0.0:
+            m = x >= lo_v
+        elif abs(lo_n - 0.0) < 1e-6 and hi_n < 1.0:
+            m = x <= hi_v
+        else:
+            m = (x >= lo_v) & (x <= hi_v)
+        mask = m if mask is None else (mask & m)
+    return mask
+
+def _calculate_real_stats_from_trades(trades) -> dict:
     if not trades: return {"N": 0, "WR": 0.0, "Pbar": 0.0, "profit_sum": 0.0, "wins": 0, "losses": 0}
-    pnl = np.array([float(t.get("pnl", 0.0)) for t in trades])
-    n = len(pnl)
+    k = _kernel_row(trade_stats_kernel(_trade_pnl(trades)))
+    n = k["trades"]
     if n == 0: return {"N": 0, "WR": 0.0, "Pbar": 0.0, "profit_sum": 0.0, "wins": 0, "losses": 0}
-    wins = int((pnl > 0).sum())
-    return {"N": n, "WR": (wins / n) * 100.0, "Pbar": float(pnl.mean()), "profit_sum": float(pnl.sum()), "wins": wins, "losses": n - wins}
+    return {"N": n, "WR": k["winRate"], "Pbar": k["mean"], "profit_sum": k["sum"], "wins": k["wins"], "losses": k["losses"]}
 
-def _metrics(df, mask, mask_pos, cfg:_FConf):
-    sel = df.loc[mask]; n_total = int(mask_pos.sum())
-    trade_rows = sel[sel["signal"] != 0]; n = len(trade_rows)
+def _metrics(df, mask: BitMask, mask_pos: BitMask, cfg:_FConf):
+    n_total = mask_pos.count()
+    rows = mask.indices(); n = rows.size  # mask ⊆ mask_pos: hepsi sinyal satırı
     if n == 0: return {"N":0, "WR":0.0, "profit_sum":0.0, "coverage":0.0, "wins":0, "losses":0, "synthetic_profit_sum": -1e9}
-    real_pnl = trade_rows["pnl"].values; real_wins = int((real_pnl > 0).sum())
-    signals = trade_rows["signal"].values.astype(int)
+    real_pnl = df["pnl"].to_numpy()[rows]; real_wins = int((real_pnl > 0).sum())
+    signals = df["signal"].to_numpy()[rows].astype(int)
     synth_pnl = np.where(signals == 1, cfg.tp, -cfg.sl)
     return {"N": n, "WR": (real_wins / n) * 100.0 if n > 0 else 0.0, "profit_sum": float(real_pnl.sum()), "coverage": float(n / n_total) if n_total > 0 else 0.0, "wins": real_wins, "losses": n - real_wins, "synthetic_profit_sum": float(synth_pnl.sum())}
 
@@ -3477,7 +4827,16 @@ def _optimize_bayesian(fdf, bounds_a, conf, cols, params: Dict | None = None) ->
         mask, mask_pos = _eval_mask(fdf, intervals_n, bounds_a)
         m = _metrics(fdf, mask, mask_pos, conf)
         return -_obj(m, conf)
-    res = gp_minimize(func=objective, dimensions=space, n_calls=n_calls, random_state=42)
+    surrogate = surrogate_kind(params)
+    if surrogate != "gp":
+        # 2×len(cols) boyutta GP kötü ölçeklenir -> ağaç topluluğu surrogate
+        res = SimpleNamespace(**surrogate_minimize(
+            lambda xs: [objective(x) for x in xs], [(0.0, 1.0, False)] * len(space), n_calls=n_calls,
+            n_initial_points=int(params.get("n_initial_points", 10)), surrogate=surrogate,
+            refit_every=int(params.get("refit_every", 5)), seed=params.get("seed", 42),
+        ))
+    else:
+        res = gp_minimize(func=objective, dimensions=space, n_calls=n_calls, random_state=42)
     p, s = res.x, -res.fun
     intervals_n = {c: (min(p[2*i], p[2*i+1]), max(p[2*i], p[2*i+1])) for i, c in enumerate(cols)}
     mask, mask_pos = _eval_mask(fdf, intervals_n, bounds_a)
@@ -3509,6 +4868,22 @@ def _optimize_genetic(fdf, bounds_a, conf, cols, params: Dict | None = None) ->
 # Ana Filtre Önerme Fonksiyonu (Orkestratör)
 # -----------------------------------------------------------------------------
 
+def _validate_filter_candidate(ctx: Dict[str, Any], intervals_n) -> Dict[str, Any]:
+    """
+    Tek aday için final simülasyon (process pool worker'ında da çalışır).
+    Filtresiz seyrek giriş listesi, önceden hesaplanmış kolon maskeleriyle süzülür.
+    """
+    mask = _intervals_to_mask(ctx["cols_a"], intervals_n or {}, ctx["bounds_a"])
+    if mask is None:
+        return ctx["baseline"]
+    sp = ctx["entries"]
+    keep = mask[sp.idx]
+    trades = simulate_scheme_over_entries(
+        ctx["df"], ctx["symbol"], SparseEntries(sp.idx[keep], sp.sgn[keep]), ctx["side"], ctx["leverage"], ctx["sch"],
+        fee_pct=ctx["fee_pct"], slippage_pct=ctx["slippage_pct"],
+    )
+    return {"n_trades": len(trades), "metrics": _calculate_real_stats_from_trades(trades)}
+
 @app.post("/filters/suggest")
 def filters_suggest(req: FilterSuggestReq):
     """
@@ -3575,12 +4950,10 @@ def filters_suggest(req: FilterSuggestReq):
         # ---------------- 4) Optimizasyon veri hazırlığı ----------------
         pnl_series = pd.Series(0.0, index=df.index, dtype=float)
         pos_series = pd.Series(0, index=df.index, dtype=int)
-        for t in trades_initial:
-            ei = t.get("entry_i")
-            pnl = float(t.get("pnl", 0.0))
-            if ei is not None and 0 <= int(ei) < len(df):
-                pnl_series.iat[int(ei)] = pnl
-                pos_series.iat[int(ei)] = 1 if pnl > 0.0 else -1
+        ei = trades_initial.entry_i
+        ok = (ei >= 0) & (ei < len(df))
+        pnl_series.values[ei[ok]] = trades_initial.pnl[ok]
+        pos_series.values[ei[ok]] = np.where(trades_initial.pnl[ok] > 0.0, 1, -1)
 
         if (pos_series != 0).sum() == 0 and entries_mask_initial.sum() > 0:
             pos_series[entries_mask_initial] = int(np.sign(getattr(req, "side", 1)) or 1)
@@ -3605,7 +4978,7 @@ def filters_suggest(req: FilterSuggestReq):
             samples=int(getattr(req, "samples", 500) or 500),
         )
 
-        baseline_mask = fdf["signal"] != 0
+        baseline_mask = BitMask.from_bool(fdf["signal"].to_numpy() != 0)
         baseline_metrics = _metrics(fdf, baseline_mask, baseline_mask, conf)
         baseline_intervals_n = {c: (0.0, 1.0) for c in cols}
         baseline_payload = {
@@ -3636,54 +5009,41 @@ def filters_suggest(req: FilterSuggestReq):
         best_sorted = sorted(best_heap, key=lambda x: x[0], reverse=True)
         candidate_payloads = [p for _, _, p in best_sorted]
 
-        chosen = None
-
-        for payload in candidate_payloads:
-            final_rules = payload.get("rules", [])
-            final_expr = f"({req.expr}) & ({' & '.join(final_rules)})" if final_rules else req.expr
-
-            final_ent_signed = expr_to_entries(
-                df, final_expr, req.params or {}, side=req.side, respect_expr_sign=True
-            )
-            final_sgn = pd.Series(np.sign(final_ent_signed).astype(int), index=df.index)
-            final_entries_mask = final_sgn != 0
-
-            final_trades = simulate_scheme_over_entries(
-                df, req.symbol, final_entries_mask, req.side, req.leverage, sch,
-                sgn_series=final_sgn,
-                fee_pct=float(getattr(req, "fee_pct", 0.0) or 0.0),
-                slippage_pct=float(getattr(req, "slippage_pct", 0.0) or 0.0),
-            )
-
-            cov = (len(final_trades) / max(1, len(trades_initial))) if trades_initial else 0.0
-            if cov + 1e-12 < float(req.min_cov):
-                continue
+        # Adaylar paralel doğrulanır; filtresiz seyrek girişler kolon maskeleriyle süzülür
+        # (ifade metni yeniden değerlendirilmez). Sıradaki ilk geçerli aday bulununca durulur.
+        n_initial = len(trades_initial)
+        def _coverage(res):
+            return (res["n_trades"] / max(1, n_initial)) if trades_initial else 0.0
+
+        val_ctx = {
+            "df": df, "symbol": req.symbol, "side": req.side, "leverage": req.leverage, "sch": sch,
+            "fee_pct": float(getattr(req, "fee_pct", 0.0) or 0.0),
+            "slippage_pct": float(getattr(req, "slippage_pct", 0.0) or 0.0),
+            "entries": SparseEntries.from_mask(sgn_series_initial != 0, sgn_series_initial, req.side),
+            "cols_a": {c: df[c].to_numpy() for c in cols},
+            "bounds_a": bounds_a,
+            "baseline": {"n_trades": n_initial, "metrics": _calculate_real_stats_from_trades(trades_initial)},
+        }
+        validated = _map_ordered(
+            _validate_filter_candidate,
+            [p.get("intervals_n") for p in candidate_payloads],
+            val_ctx,
+            n_jobs=(req.method_params or {}).get("n_jobs"),
+            stop=lambda res: _coverage(res) + 1e-12 >= float(req.min_cov),
+        )
 
-            chosen = payload
-            m = _calculate_real_stats_from_trades(final_trades)
-            chosen.setdefault("metrics", {}).update(m)
-            chosen["metrics"]["coverage"] = cov
-            break
+        chosen = None
+        if validated and _coverage(validated[-1]) + 1e-12 >= float(req.min_cov):
+            chosen = candidate_payloads[len(validated) - 1]
+            chosen.setdefault("metrics", {}).update(validated[-1]["metrics"])
+            chosen["metrics"]["coverage"] = _coverage(validated[-1])
 
-        # Baseline da min_cov'ı sağlayamazsa boş dön
+        # Baseline da min_cov'ı sağlayamazsa boş dön (baseline = filtresiz sim, tekrar koşulmaz)
         if chosen is None:
-            baseline_ent_signed = expr_to_entries(
-                df, req.expr, req.params or {}, side=req.side, respect_expr_sign=True
-            )
-            baseline_sgn = pd.Series(np.sign(baseline_ent_signed).astype(int), index=df.index)
-            baseline_entries_mask = baseline_sgn != 0
-
-            baseline_trades = simulate_scheme_over_entries(
-                df, req.symbol, baseline_entries_mask, req.side, req.leverage, sch,
-                sgn_series=baseline_sgn,
-                fee_pct=float(getattr(req, "fee_pct", 0.0) or 0.0),
-                slippage_pct=float(getattr(req, "slippage_pct", 0.0) or 0.0),
-            )
-            cov = (len(baseline_trades) / max(1, len(trades_initial))) if trades_initial else 0.0
+            cov = _coverage(val_ctx["baseline"])
             if cov + 1e-12 >= float(req.min_cov):
                 chosen = baseline_payload
-                m = _calculate_real_stats_from_trades(baseline_trades)
-                chosen.setdefault("metrics", {}).update(m)
+                chosen.setdefault("metrics", {}).update(val_ctx["baseline"]["metrics"])
                 chosen["metrics"]["coverage"] = cov
 
         if chosen is None:
@@ -3926,18 +5286,221 @@ from copy import deepcopy
 
 
 
+# ---- GP primitifleri (NumPy) ----
+# SeriesT = bitişik float64 dizi, MaskT = bool dizi. Pandas hizalama/NA yolu yok.
+def _gp_div(a, b):
+    """a / b; b == 0 ya da NaN sonuç -> 0 (eski pandas fillna davranışı)."""
+    out = np.zeros(np.broadcast(a, b).shape)
+    np.divide(a, b, out=out, where=(b != 0.0))
+    out[np.isnan(out)] = 0.0
+    return out
+
+def _gp_cmp(ufunc):
+    # karşılaştırma -> paketlenmiş maske; & / | kelime düzeyinde
+    def cmp(a, b):
+        return BitMask.from_bool(ufunc(a, b))
+    cmp.__name__ = ufunc.__name__
+    return cmp
+
+# operatör -> (primitive adı, fonksiyon, giriş tipi, çıkış tipi); "S" = SeriesT (float64), "M" = MaskT (BitMask)
+GP_ARRAY_OPS: Dict[str, tuple] = {
+    "+":  ("_add", np.add,         "S", "S"),
+    "-":  ("_sub", np.subtract,    "S", "S"),
+    "*":  ("_mul", np.multiply,    "S", "S"),
+    "/":  ("_div", _gp_div,        "S", "S"),
+    ">":  ("_gt",  _gp_cmp(np.greater),       "S", "M"),
+    "<":  ("_lt",  _gp_cmp(np.less),          "S", "M"),
+    ">=": ("_ge",  _gp_cmp(np.greater_equal), "S", "M"),
+    "<=": ("_le",  _gp_cmp(np.less_equal),    "S", "M"),
+    "&":  ("_and", BitMask.__and__, "M", "M"),
+    "|":  ("_or",  BitMask.__or__,  "M", "M"),
+}
+
+GP_COMMUTATIVE = {"_add", "_mul", "_and", "_or"}
+
+class SubtreeCache:
+    """
+    Koşu boyunca kanonik alt ağaç metni -> hesaplanmış dizi / BitMask. Bayt bütçeli LRU;
+    saklanan diziler salt-okunur işaretlenir (paylaşılan sonuçlar yerinde değiştirilmesin).
+    """
+    def __init__(self, max_bytes: int = 256 << 20):
+        from collections import OrderedDict
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._d: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        v = self._d.get(key)
+        if v is None:
+            self.misses += 1
+            return None
+        self._d.move_to_end(key)
+        self.hits += 1
+        return v
+
+    def put(self, key: str, value: np.ndarray) -> np.ndarray:
+        if self.max_bytes <= 0 or value.nbytes > self.max_bytes:
+            return value
+        (value.words if isinstance(value, BitMask) else value).flags.writeable = False
+        old = self._d.pop(key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._d[key] = value
+        self.nbytes += value.nbytes
+        while self.nbytes > self.max_bytes:
+            _, ev = self._d.popitem(last=False)
+            self.nbytes -= ev.nbytes
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._d), "bytes": int(self.nbytes), "hits": int(self.hits), "misses": int(self.misses)}
+
+def gp_subtree_keys(tree) -> tuple:
+    """
+    Prefix ağaç -> (keys, kids): her düğümün kanonik alt ağaç metni ve çocuk indeksleri.
+    Değişmeli operatörlerde argüman metinleri sıralanır (_add(T1, T0) == _add(T0, T1)).
+    """
+    n = len(tree)
+    keys: List[Optional[str]] = [None] * n
+    kids: List[Optional[List[int]]] = [None] * n
+    stack: List[int] = []
+    for i in range(n - 1, -1, -1):
+        node = tree[i]
+        if node.arity == 0:
+            keys[i] = node.name
+        else:
+            ch = [stack.pop() for _ in range(node.arity)]
+            kids[i] = ch
+            ks = [keys[c] for c in ch]
+            if node.name in GP_COMMUTATIVE:
+                ks.sort()
+            keys[i] = f"{node.name}({', '.join(ks)})"
+        stack.append(i)
+    return keys, kids
+
+def _gp_build(tree, i: int, keys, kids, context, cache):
+    # modül seviyesinde özyineleme: iç içe build closure'ı referans döngüsü (ve GC yükü) yaratmasın
+    if kids[i] is None:
+        j = context[tree[i].name]
+        return lambda table: table[j]
+    fn = context[tree[i].name]
+    c0, c1 = kids[i]  # tüm primitive'ler ikili
+    a = _gp_build(tree, c0, keys, kids, context, cache)
+    b = _gp_build(tree, c1, keys, kids, context, cache)
+    if cache is None:
+        return lambda table: fn(a(table), b(table))
+    key = keys[i]
+
+    def node(table):
+        v = cache.get(key)
+        if v is None:
+            v = cache.put(key, fn(a(table), b(table)))
+        return v
+    return node
+
+def gp_compile(tree, context: Dict[str, Any], cache: Optional[SubtreeCache] = None,
+               tree_keys: Optional[tuple] = None):
+    """
+    Ağacı bir kez dolaşıp iç içe closure üretir: f(table) -> dizi (eval / kaynak metni yok).
+    context: primitive adı -> fonksiyon, terminal adı -> table indeksi (pset.context).
+    cache verilirse her primitive düğümü kanonik alt ağaç anahtarıyla önbelleğe bakar;
+    isabette çocuk closure'lar hiç çağrılmaz. tree_keys = gp_subtree_keys(tree).
+    """
+    keys, kids = tree_keys or gp_subtree_keys(tree)
+    return _gp_build(tree, 0, keys, kids, context, cache)
+
+def _gp_eval_worker(ctx: Dict[str, Any], item: tuple):
+    """Worker: (fonksiyon adı, ağaç metni) -> ağacı ctx['pset'] ile yeniden kurar, ctx[ad] ile skorlar."""
+    from deap import gp
+    name, tree_str = item
+    return ctx[name](gp.PrimitiveTree.from_string(tree_str, ctx["pset"]))
+
+def gp_static_limit(max_height: int, max_size: int, clone):
+    """
+    gp.staticLimit muadili (yükseklik + boyut tek dekoratörde): operatör sonrası sınırı aşan
+    çocuk, rastgele bir ebeveynin kopyasıyla değiştirilir. Kopya deepcopy yerine clone ile.
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            keep = [clone(ind) for ind in args]
+            out = list(func(*args, **kwargs))
+            for i, ind in enumerate(out):
+                if ind.height > max_height or len(ind) > max_size:
+                    out[i] = random.choice(keep)
+            return out
+        return wrapper
+    return decorator
+
+def sel_lexicographic(individuals, k: int, tournsize: int):
+    """Lexicographic parsimony turnuvası: fitness eşitse küçük ağaç kazanır."""
+    return [max(random.sample(individuals, min(tournsize, len(individuals))),
+                key=lambda ind: (ind.fitness.values[0], -len(ind)))
+            for _ in range(k)]
+
+# ---- GP checkpoint: popülasyon / HOF ağaç metni olarak, RNG durumu, nesil sayacı, fitness önbelleği
+GP_CHECKPOINT_DIR = os.environ.get("GP_CHECKPOINT_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), "gp_checkpoints")))
+
+def _gp_checkpoint_path(run_id: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_\-]{1,64}", run_id or ""):
+        raise HTTPException(status_code=400, detail="run_id: 1-64 karakter [A-Za-z0-9_-] olmalı.")
+    return os.path.join(GP_CHECKPOINT_DIR, f"{run_id}.pkl")
+
+def save_gp_checkpoint(run_id: str, state: Dict[str, Any]) -> None:
+    """Atomik yazım (tmp + replace): yazım sırasında çökme önceki checkpoint'i bozmaz."""
+    import pickle
+    path = _gp_checkpoint_path(run_id)
+    os.makedirs(GP_CHECKPOINT_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def load_gp_checkpoint(run_id: str) -> Dict[str, Any]:
+    import pickle
+    path = _gp_checkpoint_path(run_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"GP checkpoint bulunamadı: {run_id}")
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+class GPResumeReq(BaseModel):
+    run_id: str
+    extra_generations: int = 0               # >0: biten koşuyu bu kadar nesil uzat
+    data_snapshot_id: Optional[str] = None   # yeniden başlatma sonrası aynı veriyle alınmış yeni snapshot
+    max_seconds: Optional[float] = None
+    max_evals: Optional[int] = None
+    n_jobs: Optional[int] = None
+
 @app.post("/optimize/generate")
 def generate_strategy_gp(req: GPStrategyReq):
+    return run_strategy_gp(req)
+
+@app.post("/optimize/generate/resume")
+def resume_strategy_gp(req: GPResumeReq):
+    """Checkpoint'ten devam: yarıda kalan koşuyu tamamlar ya da biten koşuyu extra_generations kadar uzatır."""
+    state = load_gp_checkpoint(req.run_id)
+    gp_req = GPStrategyReq(**state["req"])
+    gp_req.run_id = req.run_id
+    gp_req.generations = int(state["generations"]) + max(0, int(req.extra_generations or 0))
+    gp_req.max_seconds, gp_req.max_evals = req.max_seconds, req.max_evals
+    if req.data_snapshot_id:
+        gp_req.data_snapshot_id = req.data_snapshot_id
+    if req.n_jobs is not None:
+        gp_req.n_jobs = req.n_jobs
+    return run_strategy_gp(gp_req, resume=state)
+
+def run_strategy_gp(req: GPStrategyReq, resume: Optional[Dict[str, Any]] = None):
     """
-    Typed GP (pandas):
-      - Types: SeriesT (float series), MaskT (0/1 series)
-      - Ops: +,-,*,/ -> Series; >,<,>=,<= -> Mask; &,| -> Mask
-      - No numpy, no abs/neg/tanh, no ephemerals
+    Typed GP (NumPy):
+      - Types: SeriesT (float64 array), MaskT (BitMask, paketlenmiş uint64)
+      - Ops: +,-,*,/ -> Series; >,<,>=,<= -> Mask; &,| -> Mask (GP_ARRAY_OPS)
+      - No abs/neg/tanh, no ephemerals
       - Render: data['<column>']
       - At least one comparison required in tree
     """
     import math
-    import copy
     import random
     import pandas as pd
     from deap import base as deap_base, creator, tools as deap_tools, gp
@@ -3950,6 +5513,10 @@ def generate_strategy_gp(req: GPStrategyReq):
     df: pd.DataFrame = SNAPSHOT_STORE[sid]["df"].copy()
     if df is None or len(df) < 100:
         raise HTTPException(status_code=400, detail="No data (or too short). Download data first.")
+    data_fp = snapshot_fingerprint(sid)
+    if resume is not None and resume.get("data_fp") != data_fp:
+        # fitness önbelleği ve popülasyon skorları sadece aynı veride geçerli
+        raise HTTPException(status_code=409, detail="Checkpoint farklı bir veriyle alınmış; aynı verinin snapshot'ını verin.")
 
     # indikatörleri üret
     df = compute_indicators(df, timeframe=req.timeframe, **(req.ind_params or {}))
@@ -3984,8 +5551,8 @@ def generate_strategy_gp(req: GPStrategyReq):
         df[c] = s.ffill().bfill().fillna(0.0)
 
     # ---------- 1) TYPES ----------
-    class SeriesT: pass   # pd.Series (float)
-    class MaskT:   pass   # pd.Series (0/1 float)
+    class SeriesT: pass   # np.ndarray (float64)
+    class MaskT:   pass   # BitMask
 
     # ---------- 2) CREATOR ----------
     if "FitnessMax" not in creator.__dict__:
@@ -3997,56 +5564,23 @@ def generate_strategy_gp(req: GPStrategyReq):
     # Çıktı tipi MaskT: (0/1) sinyal
     pset = gp.PrimitiveSetTyped("STRAT", [], MaskT)
 
-    # Pandas broadcast helper (numpy yok)
-    def _S(x) -> pd.Series:
-        if isinstance(x, pd.Series):
-            return x
-        return pd.Series([x] * len(df), index=df.index, dtype=float)
-
-    # Series×Series -> Series
-    def _add(a, b): return _S(a) + _S(b)
-    def _sub(a, b): return _S(a) - _S(b)
-    def _mul(a, b): return _S(a) * _S(b)
-    def _div(a, b):
-        A, B = _S(a), _S(b)
-        Bz = B.where(B != 0.0, other=pd.NA)
-        return (A / Bz).fillna(0.0)
-
-    # Series×Series -> Mask
-    def _gt(a, b): return (_S(a) >  _S(b)).astype(float)
-    def _lt(a, b): return (_S(a) <  _S(b)).astype(float)
-    def _ge(a, b): return (_S(a) >= _S(b)).astype(float)
-    def _le(a, b): return (_S(a) <= _S(b)).astype(float)
-
-    # Mask×Mask -> Mask
-    def _and(a, b):
-        A, B = _S(a), _S(b)
-        return ((A != 0) & (B != 0)).astype(float)
-    def _or(a, b):
-        A, B = _S(a), _S(b)
-        return ((A != 0) | (B != 0)).astype(float)
-
-    allowed = set(req.operators_to_use or ["+","-","*","/","<",">","<=",">=","&","|"])
+    allowed = set(req.operators_to_use or list(GP_ARRAY_OPS))
     if not ({"<",">","<=",">="} & allowed):
         raise HTTPException(status_code=422, detail="At least one comparator (>, <, >=, <=) must be enabled.")
 
-    if "+" in allowed:  pset.addPrimitive(_add, [SeriesT, SeriesT], SeriesT, name="_add")
-    if "-" in allowed:  pset.addPrimitive(_sub, [SeriesT, SeriesT], SeriesT, name="_sub")
-    if "*" in allowed:  pset.addPrimitive(_mul, [SeriesT, SeriesT], SeriesT, name="_mul")
-    if "/" in allowed:  pset.addPrimitive(_div, [SeriesT, SeriesT], SeriesT, name="_div")
-    if ">" in allowed:  pset.addPrimitive(_gt,  [SeriesT, SeriesT], MaskT,  name="_gt")
-    if "<" in allowed:  pset.addPrimitive(_lt,  [SeriesT, SeriesT], MaskT,  name="_lt")
-    if ">=" in allowed: pset.addPrimitive(_ge,  [SeriesT, SeriesT], MaskT,  name="_ge")
-    if "<=" in allowed: pset.addPrimitive(_le,  [SeriesT, SeriesT], MaskT,  name="_le")
-    if "&" in allowed:  pset.addPrimitive(_and, [MaskT,   MaskT],   MaskT,  name="_and")
-    if "|" in allowed:  pset.addPrimitive(_or,  [MaskT,   MaskT],   MaskT,  name="_or")
+    TYPES = {"S": SeriesT, "M": MaskT}
+    for op, (name, fn, t_in, t_out) in GP_ARRAY_OPS.items():
+        if op in allowed:
+            pset.addPrimitive(fn, [TYPES[t_in], TYPES[t_in]], TYPES[t_out], name=name)
 
     # ---------- 4) TERMINALS ----------
-    # DEĞER = pd.Series (!!!), isim -> kolon adı haritası
+    # DEĞER = TABLE indeksi (hafif referans); TABLE[i] = terminal matrisinin satırı. İsim -> kolon adı haritası
+    X = np.ascontiguousarray(df[use_cols].to_numpy(dtype=np.float64).T)
+    TABLE: List[Any] = list(X)
     NAME_RENDER: dict[str, str] = {}
     for i, c in enumerate(use_cols):
         internal = f"T{i}"
-        pset.addTerminal(df[c], SeriesT, name=internal)
+        pset.addTerminal(i, SeriesT, name=internal)
         NAME_RENDER[internal] = c
 
     # Seed comparison terminal (MaskT) — gerçek 0/1 seri
@@ -4057,21 +5591,43 @@ def generate_strategy_gp(req: GPStrategyReq):
         return (cols[0], cols[1] if len(cols) > 1 else cols[0])
 
     a_col, b_col = _pick_two(use_cols)
-    seed_series = (df[a_col] > df[b_col]).astype(float)
+    seed_series = BitMask.from_bool(df[a_col].to_numpy() > df[b_col].to_numpy())
     seed_expr   = f"(data['{a_col}'] > data['{b_col}'])"
-    pset.addTerminal(seed_series, MaskT, name="CMP0")
+    TABLE.append(seed_series)
+    pset.addTerminal(len(TABLE) - 1, MaskT, name="CMP0")
 
     # ---------- 5) TOOLBOX ----------
     toolbox = deap_base.Toolbox()
     toolbox.register("expr", gp.genHalfAndHalf, pset=pset, min_=2, max_=5)
     toolbox.register("individual", deap_tools.initIterate, creator.Individual, toolbox.expr)
     toolbox.register("population", deap_tools.initRepeat, list, toolbox.individual)
-    toolbox.register("compile", gp.compile, pset=pset)
-    toolbox.register("clone", copy.deepcopy)
-    toolbox.register("select", deap_tools.selTournament, tournsize=int(getattr(req,"tournament_k",3)))
+    toolbox.register("compile", gp_compile, context=pset.context)
+
+    def _clone(ind):
+        # düğümler pset'in paylaşılan, değişmez nesneleri: liste kopyası yeterli (deepcopy yok)
+        c = creator.Individual(ind)
+        if ind.fitness.valid:
+            c.fitness.values = ind.fitness.values
+        return c
+    toolbox.register("clone", _clone)
+    tourn_k = int(getattr(req, "tournament_k", 3) or 3)
+    selection = (getattr(req, "selection", "tournament") or "tournament").lower().strip()
+    if selection == "double":
+        toolbox.register("select", deap_tools.selDoubleTournament, fitness_size=tourn_k,
+                         parsimony_size=min(2.0, max(1.0, float(getattr(req, "parsimony_size", 1.4) or 1.4))),
+                         fitness_first=True)
+    elif selection == "lexicographic":
+        toolbox.register("select", sel_lexicographic, tournsize=tourn_k)
+    else:
+        toolbox.register("select", deap_tools.selTournament, tournsize=tourn_k)
     toolbox.register("mate", gp.cxOnePoint)
     toolbox.register("expr_mut", gp.genFull, min_=1, max_=3)
     toolbox.register("mutate", gp.mutUniform, expr=toolbox.expr_mut, pset=pset)
+    # bloat kontrolü: sert yükseklik / boyut sınırı (complexity_penalty sadece yumuşak baskı)
+    max_height = max(2, int(getattr(req, "max_height", 12) or 12))
+    max_size = max(3, int(getattr(req, "max_size", 60) or 60))
+    toolbox.decorate("mate", gp_static_limit(max_height, max_size, _clone))
+    toolbox.decorate("mutate", gp_static_limit(max_height, max_size, _clone))
 
     # ---------- 6) TREE -> EXPR (data['<kolon>']) ----------
     OP = {"_add":"+","_sub":"-","_mul":"*","_div":"/","_gt":">","_lt":"<","_ge":">=","_le":"<=","_and":"&","_or":"|"}
@@ -4113,43 +5669,51 @@ def generate_strategy_gp(req: GPStrategyReq):
     def _has_comparison(ind):
         return any(getattr(n, "name", "") in CMP_NAMES for n in ind if isinstance(n, gp.Primitive))
 
-    def _mask_to_intent(mask: pd.Series, side_flag: int) -> pd.Series:
-        m = mask.fillna(0).clip(0,1)
-        if side_flag == 1:   return m.astype(int)        # long-only  (0/1)
-        if side_flag == -1:  return (-m).astype(int)     # short-only (0/-1)
-        return (m*2 - 1).astype(int)                     # both (-1/1)
+    def _mask_to_entries(mask: BitMask, side_flag: int) -> SparseEntries:
+        if side_flag == 1:   # long-only  (0/1)
+            idx = mask.indices()
+            return SparseEntries(idx, np.ones(idx.size, dtype=np.int8))
+        if side_flag == -1:  # short-only (0/-1)
+            idx = mask.indices()
+            return SparseEntries(idx, np.full(idx.size, -1, dtype=np.int8))
+        # both (-1/1): her bar bir giriş
+        return SparseEntries(np.arange(mask.n, dtype=np.int64), np.where(mask.to_bool(), 1, -1).astype(np.int8))
+
+    # alt ağaç önbelleği: popülasyonda ortak alt ağaçlar (örn. _gt(T3, T7)) bir kez hesaplanır
+    sub_cache = SubtreeCache(int(float(getattr(req, "subtree_cache_mb", 256.0) or 0.0) * (1 << 20)))
 
-    def _eval(ind):
+    def _entries(ind, tree_keys=None) -> Optional[SparseEntries]:
         if not _has_comparison(ind):
-            return (-1e9,), {}
+            return None
+        out = toolbox.compile(ind, cache=sub_cache, tree_keys=tree_keys)(TABLE)
+        if not isinstance(out, BitMask):
+            return None
+        entries = _mask_to_entries(out, side)
+        return entries if len(entries) else None
+
+    def _objective(stats) -> float:
+        if obj == "sharpe":
+            score = float(stats.get("sharpe", 0.0) or 0.0)
+        elif obj == "winrate":
+            score = float(stats.get("winRate", 0.0) or 0.0)
+        elif obj == "pf":
+            score = float(stats.get("pf", 0.0) or 0.0)
+        else:
+            score = float(stats.get("profit", 0.0) or 0.0)
+        return score if math.isfinite(score) else -1e9
+
+    def _eval(ind, tree_keys=None):
         try:
-            func = toolbox.compile(expr=ind)
-            out  = func()  # -> pd.Series
-            if not isinstance(out, pd.Series):
-                return (-1e9,), {}
-            mask = out.fillna(0).clip(0,1)
-            intent = _mask_to_intent(mask, side)
-            entry_mask = intent != 0
-            if entry_mask.sum() == 0:
+            entries = _entries(ind, tree_keys)
+            if entries is None:
                 return (-1e9,), {}
 
             trades = simulate_scheme_over_entries(
-                df, req.symbol, entry_mask, side, lev, exit_scheme,
-                sgn_series=intent, fee_pct=fee, slippage_pct=slp
+                df, req.symbol, entries, side, lev, exit_scheme,
+                fee_pct=fee, slippage_pct=slp
             )
             stats = stats_from_trades_basic(trades)
-
-            if obj == "sharpe":
-                score = float(stats.get("sharpe", 0.0) or 0.0)
-            elif obj == "winrate":
-                score = float(stats.get("winRate", 0.0) or 0.0)
-            elif obj == "pf":
-                score = float(stats.get("pf", 0.0) or 0.0)
-            else:
-                score = float(stats.get("profit", 0.0) or 0.0)
-
-            if not math.isfinite(score):
-                score = -1e9
+            score = _objective(stats)
 
         except Exception:
             return (-1e9,), {}
@@ -4157,57 +5721,391 @@ def generate_strategy_gp(req: GPStrategyReq):
         score -= pen * len(ind)
         return (score,), stats
 
+    # Çok aşamalı fitness: fidelity="proxy" -> giriş barlarından sonraki proxy_horizon bar getirisi (vektörel),
+    # "window" -> son proxy_window kesrinde tam simülasyon. Sadece en iyi promote_fraction tam backtest'e gider.
+    def _req(name, default):
+        v = getattr(req, name, None)
+        return default if v is None else v  # açık 0 değeri varsayılana dönmesin
+
+    fidelity = str(_req("fidelity", "full")).lower().strip()
+    if fidelity not in ("full", "proxy", "window"):
+        raise HTTPException(status_code=422, detail=f"Unknown fidelity '{fidelity}'. Use one of: full, proxy, window.")
+    promote = min(1.0, max(0.0, float(_req("promote_fraction", 0.3))))
+    horizon = max(1, int(_req("proxy_horizon", 10)))
+    close_a = df["close"].to_numpy(dtype=np.float64)
+    w0 = int(len(df) * (1.0 - min(1.0, max(0.01, float(_req("proxy_window", 0.25))))))
+    df_win = df.iloc[w0:]
+    net_cost = 2.0 * (fee + slp) / 100.0
+
+    def _cheap(ind, tree_keys=None) -> float:
+        try:
+            entries = _entries(ind, tree_keys)
+            if entries is None:
+                return -1e9
+            if fidelity == "window":
+                sel = entries.idx >= w0
+                if not sel.any():
+                    return -1e9
+                trades = simulate_scheme_over_entries(
+                    df_win, req.symbol, SparseEntries(entries.idx[sel] - w0, entries.sgn[sel]), side, lev,
+                    exit_scheme, fee_pct=fee, slippage_pct=slp
+                )
+                score = _objective(stats_from_trades_basic(trades))
+            else:
+                # tek pozisyon yaklaşımı: her horizon'luk blokta sadece ilk giriş
+                _, first = np.unique(entries.idx // horizon, return_index=True)
+                i, sg = entries.idx[first], entries.sgn[first]
+                sel = i + horizon < close_a.size
+                i, sg = i[sel], sg[sel]
+                if not i.size:
+                    return -1e9
+                r = sg * (close_a[i + horizon] / close_a[i] - 1.0) * lev - net_cost
+                if obj == "sharpe":
+                    score = float(r.mean() / (r.std() + 1e-12) * np.sqrt(r.size))
+                elif obj == "winrate":
+                    score = float((r > 0).mean() * 100.0)
+                else:
+                    score = float(r.sum() * 100.0)
+            return score - pen * len(ind) if math.isfinite(score) else -1e9
+        except Exception:
+            return -1e9
+
     # ---------- 8) EVOLUTION ----------
     pop_size = int(getattr(req, "population_size", 80) or 80)
     ngen     = int(getattr(req, "generations", 30) or 30)
     cxpb     = float(getattr(req, "crossover_prob", 0.7) or 0.7)
     mutpb    = float(getattr(req, "mutation_prob", 0.2) or 0.2)
 
-    pop = toolbox.population(n=pop_size)
-    hof = deap_tools.HallOfFame(20)
-
-    # initial eval
-    for ind in pop:
-        fit, _ = _eval(ind)
-        ind.fitness.values = fit
-    hof.update(pop)
-
-    for _ in range(ngen):
-        offspring = toolbox.select(pop, len(pop))
-        offspring = list(map(toolbox.clone, offspring))
-
-        for c1, c2 in zip(offspring[::2], offspring[1::2]):
-            if random.random() < cxpb:
-                toolbox.mate(c1, c2)
-                if hasattr(c1.fitness, "values"): del c1.fitness.values
-                if hasattr(c2.fitness, "values"): del c2.fitness.values
-
-        for m in offspring:
-            if random.random() < mutpb:
-                toolbox.mutate(m)
-                if hasattr(m.fitness, "values"): del m.fitness.values
-
-        invalid = [ind for ind in offspring if not ind.fitness.valid]
-        for ind in invalid:
-            fit, _ = _eval(ind)
+    # Warm start: aynı strateji parmak izine sahip önceki koşuların en iyi ağaçları (kolon adlarıyla saklanır)
+    gp_fp = strategy_fingerprint("gp", symbol=req.symbol, timeframe=req.timeframe, side=side,
+                                 exit=exit_scheme.type, objective=obj)
+    COL_TERM = {c: t for t, c in NAME_RENDER.items()}
+
+    def _tree_from_warm(item):
+        names = item.get("terminals", {})
+        if "CMP0" in item.get("tree", "") and item.get("seed_expr") != seed_expr:
+            return None
+        try:
+            txt = re.sub(r"\bT\d+\b", lambda m: COL_TERM[names[m.group(0)]], item["tree"])
+            ind = creator.Individual(gp.PrimitiveTree.from_string(txt, pset))
+        except Exception:
+            return None  # kolon ya da operatör artık yok
+        return ind if all(isinstance(n, (gp.Primitive, gp.Terminal)) for n in ind) else None
+
+    n_islands = max(1, int(getattr(req, "islands", 1) or 1))
+    if n_islands > 1 and _mp_context().get_start_method() != "fork":
+        print("[gp] island modeli fork gerektirir; tek popülasyonla devam ediliyor.")
+        n_islands = 1
+    budget = EvalBudget(getattr(req, "max_seconds", None), getattr(req, "max_evals", None))
+    n_evals = 0
+    ckpt_every = max(0, int(getattr(req, "checkpoint_every", 0) or 0))
+    if ckpt_every and n_islands > 1:
+        print("[gp] checkpoint sadece tek popülasyon modunda; ada modunda kapalı.")
+        ckpt_every = 0
+    run_id = (getattr(req, "run_id", None) or uuid4().hex[:12]) if ckpt_every else None
+    if run_id:
+        _gp_checkpoint_path(run_id)  # geçersiz ad koşu başlamadan reddedilsin
+
+    # fitness önbelleği: kanonik ağaç metni -> ((score,), stats). Crossover/mutasyonun ürettiği
+    # tekrar bireyler ve final rapor yeniden backtest edilmez.
+    fit_cache: Dict[str, tuple] = {}
+    fit_hits = 0
+    cheap_cache: Dict[str, float] = {}  # çok aşamalı modda ucuz skorlar
+    n_cheap = 0
+    eval_secs = 0.0  # _eval_all içinde geçen toplam süre (nesil metrikleri için)
+
+    def _fitness(ind):
+        nonlocal n_evals, fit_hits
+        tk = gp_subtree_keys(ind)
+        hit = fit_cache.get(tk[0][0])
+        if hit is not None:
+            fit_hits += 1
+            return hit
+        n_evals += 1
+        hit = fit_cache[tk[0][0]] = _eval(ind, tk)
+        return hit
+
+    # paralel değerlendirme: toolbox.map önbellekte olmayan benzersiz ağaçları worker'lara sadece
+    # metin olarak yollar; terminal matrisi, OHLC ve pset fork ile bir kez paylaşılır.
+    # (ada modunda çekirdekleri adalar kullanır; ada içi değerlendirme seri)
+    toolbox.register("evaluate", _eval)
+    toolbox.register("cheap_evaluate", _cheap)
+    gp_pool = WorkerPool({"evaluate": _eval, "cheap": _cheap, "pset": pset},
+                         n_jobs=1 if n_islands > 1 else getattr(req, "n_jobs", None))
+
+    def _map(fn, inds):
+        inds = list(inds)
+        name = next((k for k, v in gp_pool.ctx.items() if v is fn), None)
+        if name is not None and gp_pool.jobs > 1 and len(inds) > 1:
+            return gp_pool.map(_gp_eval_worker, [(name, str(ind)) for ind in inds])
+        return list(map(fn, inds))
+
+    toolbox.register("map", _map)
+
+    def _eval_all(inds) -> bool:
+        # tekrarlar fitness önbelleğinden; kalan benzersiz ağaçlar batch'ler halinde toolbox.map ile.
+        # bütçe biterse değerlendirilemeyen bireyler en kötü skorla işaretlenir; False döner
+        nonlocal n_evals, fit_hits, n_cheap, eval_secs
+        t_eval = time.perf_counter()
+        keys = [gp_subtree_keys(ind)[0][0] for ind in inds]
+        first: Dict[str, Any] = {}
+        for k, ind in zip(keys, inds):
+            if k not in fit_cache and k not in first:
+                first[k] = ind
+        todo = list(first.items())
+        demoted: Dict[str, tuple] = {}
+        if fidelity in ("proxy", "window") and len(todo) > 1:
+            # ucuz ön eleme; elenenler en kötü tam skorun altında, proxy sırasını koruyan fitness alır
+            need = [(k, ind) for k, ind in todo if k not in cheap_cache]
+            for (k, _), sc in zip(need, toolbox.map(toolbox.cheap_evaluate, [ind for _, ind in need])):
+                cheap_cache[k] = sc
+            n_cheap += len(need)
+            todo.sort(key=lambda kv: cheap_cache[kv[0]], reverse=True)
+            n_full = max(1, int(math.ceil(len(todo) * promote)))
+            todo, rest = todo[:n_full], todo[n_full:]
+            demoted = {k: j for j, (k, _) in enumerate(rest)}
+        chunk = max(1, gp_pool.jobs * 4)
+        ok, fresh = True, 0
+        for i in range(0, len(todo), chunk):
+            if budget.exhausted(n_evals):
+                ok = False
+                break
+            part = todo[i:i + min(chunk, budget.evals_left(n_evals))]
+            for (k, _), fit in zip(part, toolbox.map(toolbox.evaluate, [ind for _, ind in part])):
+                fit_cache[k] = fit
+            n_evals += len(part)
+            fresh += len(part)
+        if demoted:
+            full = [fit_cache[k][0][0] for k, _ in todo if k in fit_cache and fit_cache[k][0][0] > -1e9]
+            floor = min(full) if full else -1e9
+        served = 0
+        for ind, k in zip(inds, keys):
+            hit = fit_cache.get(k)
+            if hit is not None:
+                ind.fitness.values = hit[0]
+            elif k in demoted:
+                ind.fitness.values = (floor - 1.0 + (len(demoted) - demoted[k]) / (len(demoted) + 1.0),)
+            else:
+                ind.fitness.values = (-1e9,)
+                continue
+            served += 1
+        fit_hits += served - fresh - len(demoted)
+        eval_secs += time.perf_counter() - t_eval
+        return ok and served == len(inds)
+
+    def _initial_population(warm: bool = True):
+        pop = toolbox.population(n=pop_size)
+        n = 0
+        if warm and getattr(req, "warm_start", False):
+            seeds = [t for t in map(_tree_from_warm, WARM_START.best(gp_fp, max(1, pop_size // 4))) if t is not None]
+            pop[:len(seeds)] = seeds
+            n = len(seeds)
+        return pop, n
+
+    def _gen_stat(gen, pop, t0, e0, n0) -> dict:
+        sizes = np.fromiter((len(ind) for ind in pop), dtype=np.int64, count=len(pop))
+        fits = [ind.fitness.values[0] for ind in pop if ind.fitness.valid]
+        return {"gen": gen, "avg_size": round(float(sizes.mean()), 2), "max_size": int(sizes.max()),
+                "max_height": max(ind.height for ind in pop), "evals": n_evals - n0,
+                "eval_seconds": round(eval_secs - e0, 4), "seconds": round(time.perf_counter() - t0, 4),
+                "best": float(max(fits)) if fits else None}
+
+    def _evolve(pop, hof, on_generation=None, gen_stats=None, start_gen: int = 0) -> int:
+        """pop'u yerinde evrimleştirir; tamamlanan nesil sayısını döner (bütçe bitince erken durur).
+        gen_stats listesi verilirse nesil başına boyut / değerlendirme süresi metrikleri eklenir.
+        start_gen > 0: checkpoint'ten gelen, zaten değerlendirilmiş popülasyonla devam."""
+        ok = True
+        if not start_gen:
+            t0, e0, n0 = time.perf_counter(), eval_secs, n_evals
+            ok = _eval_all(pop)
+            hof.update(pop)
+            if gen_stats is not None:
+                gen_stats.append(_gen_stat(0, pop, t0, e0, n0))
+        gens_done = 0
+
+        for gen in range(start_gen + 1, ngen + 1 if ok else 1):
+            t0, e0, n0 = time.perf_counter(), eval_secs, n_evals
+            offspring = toolbox.select(pop, len(pop))
+            offspring = list(map(toolbox.clone, offspring))
+
+            # dekore operatörler sınırı aşan çocuğu ebeveyn kopyasıyla değiştirir: dönüş değeri kullanılır
+            for i in range(1, len(offspring), 2):
+                if random.random() < cxpb:
+                    offspring[i - 1], offspring[i] = toolbox.mate(offspring[i - 1], offspring[i])
+                    del offspring[i - 1].fitness.values, offspring[i].fitness.values
+
+            for i in range(len(offspring)):
+                if random.random() < mutpb:
+                    offspring[i], = toolbox.mutate(offspring[i])
+                    del offspring[i].fitness.values
+
+            invalid = [ind for ind in offspring if not ind.fitness.valid]
+            ok = _eval_all(invalid)
+
+            pop[:] = offspring
+            hof.update(pop)
+            if gen_stats is not None:
+                gen_stats.append(_gen_stat(gen, pop, t0, e0, n0))
+            if not ok:
+                break
+            gens_done += 1
+            if on_generation is not None:
+                on_generation(gen, pop)
+        return gens_done
+
+    def _finals(hof) -> List[tuple]:
+        # HallOfFame -> [(ağaç metni, ((score,), stats))], stats fitness önbelleğinden
+        return [(str(ind), _fitness(ind)) for ind in hof]
+
+    # ---- island model: her ada ayrı süreçte (fork) evrilir; migration_interval nesilde bir
+    # en iyi migration_size birey halkadaki sonraki adaya kuyrukla gönderilir, gelenler en kötülerin yerine geçer.
+    mig_every = max(1, int(getattr(req, "migration_interval", 5) or 5))
+    mig_size = max(1, int(getattr(req, "migration_size", 2) or 2))
+
+    def _island(i, seed, inboxes, results):
+        import queue
+        random.seed(seed)
+        if budget.max_evals:
+            budget.max_evals = max(1, -(-budget.max_evals // n_islands))  # bütçe adalara bölünür
+        inbox, outbox = inboxes[i], inboxes[(i + 1) % n_islands]
+        outbox.cancel_join_thread()  # bitmiş komşuya giden göçmenler çıkışı bekletmesin
+
+        def migrate(gen, pop):
+            if gen % mig_every:
+                return
+            outbox.put([(str(ind), ind.fitness.values) for ind in deap_tools.selBest(pop, mig_size)])
+            while True:
+                try:
+                    batch = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                immigrants = []
+                for tree_str, fit in batch:
+                    ind = creator.Individual(gp.PrimitiveTree.from_string(tree_str, pset))
+                    ind.fitness.values = fit
+                    immigrants.append(ind)
+                worst = sorted(range(len(pop)), key=lambda j: pop[j].fitness.values[0])[:len(immigrants)]
+                for j, ind in zip(worst, immigrants):
+                    pop[j] = ind
+
+        try:
+            pop, nw = _initial_population(warm=(i == 0))
+            hof = deap_tools.HallOfFame(20)
+            stats_i: List[dict] = []
+            gens = _evolve(pop, hof, migrate, stats_i)
+            results.put({"island": i, "finals": _finals(hof), "generations": gens, "evaluated": n_evals,
+                         "gen_stats": [dict(g, island=i) for g in stats_i],
+                         "fit_hits": fit_hits, "fit_entries": len(fit_cache), "cheap": n_cheap,
+                         "truncated": budget.hit, "warm": nw})
+        except Exception as e:
+            results.put({"island": i, "error": f"{type(e).__name__}: {e}"})
+
+    def _restore(items):
+        out = []
+        for tree_str, fit in items:
+            ind = creator.Individual(gp.PrimitiveTree.from_string(tree_str, pset))
             ind.fitness.values = fit
+            out.append(ind)
+        return out
+
+    island_info = None
+    gen_stats: List[dict] = []
+    if n_islands == 1:
+        hof = deap_tools.HallOfFame(20)
+        start_gen, n_warm = 0, 0
+        if resume is not None:
+            pop = _restore(resume["population"])
+            hof.update(_restore(resume["hof"]))
+            random.setstate(resume["rng"])
+            fit_cache.update(resume["fit_cache"])
+            cheap_cache.update(resume["cheap_cache"])
+            start_gen, gen_stats = int(resume["gen"]), list(resume["gen_stats"])
+            n_evals, fit_hits, n_cheap = resume["evaluated"], resume["fit_hits"], resume["cheap_evals"]
+            if budget.max_evals:
+                budget.max_evals += n_evals  # bütçe bu oturum için
+        else:
+            pop, n_warm = _initial_population()
+
+        def _checkpoint(gen, pop):
+            if gen % ckpt_every and gen != ngen:
+                return
+            # önbellekler sadece popülasyon + HOF için: checkpoint boyutu koşu uzunluğuyla büyümesin
+            keep = {gp_subtree_keys(ind)[0][0] for ind in itertools.chain(pop, hof)}
+            save_gp_checkpoint(run_id, {
+                "req": req.dict(), "generations": ngen, "gen": gen, "data_fp": data_fp,
+                "population": [(str(ind), ind.fitness.values) for ind in pop],
+                "hof": [(str(ind), ind.fitness.values) for ind in hof],
+                "rng": random.getstate(),
+                "fit_cache": {k: fit_cache[k] for k in keep if k in fit_cache},
+                "cheap_cache": {k: cheap_cache[k] for k in keep if k in cheap_cache},
+                "evaluated": n_evals, "fit_hits": fit_hits, "cheap_evals": n_cheap, "gen_stats": gen_stats,
+            })
 
-        pop[:] = offspring
-        hof.update(pop)
+        try:
+            gens_done = start_gen + _evolve(pop, hof, _checkpoint if ckpt_every else None, gen_stats, start_gen)
+        finally:
+            gp_pool.close()
+        finals = _finals(hof)
+        truncated, fit_entries = budget.hit, len(fit_cache)
+    else:
+        import queue
+        mpc = _mp_context()
+        inboxes = [mpc.Queue() for _ in range(n_islands)]
+        island_results = mpc.Queue()
+        seeds = [random.getrandbits(32) for _ in range(n_islands)]
+        procs = [mpc.Process(target=_island, args=(i, seeds[i], inboxes, island_results), daemon=True)
+                 for i in range(n_islands)]
+        for pr in procs:
+            pr.start()
+        outs = []
+        while len(outs) < n_islands:
+            try:
+                outs.append(island_results.get(timeout=1.0))
+            except queue.Empty:
+                if not any(pr.is_alive() for pr in procs) and island_results.empty():
+                    break  # çöken ada sonuç göndermedi
+        for pr in procs:
+            pr.join(timeout=5.0)
+            if pr.is_alive():
+                pr.terminate()
+
+        finals, gens_done, n_warm, truncated, fit_entries = [], 0, 0, False, 0
+        for o in outs:
+            if "error" in o:
+                print(f"[gp] ada {o['island']} hata: {o['error']}")
+                continue
+            finals += o["finals"]
+            gen_stats += o["gen_stats"]
+            gens_done = max(gens_done, o["generations"])
+            n_evals += o["evaluated"]
+            fit_hits += o["fit_hits"]
+            fit_entries += o["fit_entries"]
+            n_cheap += o["cheap"]
+            n_warm += o["warm"]
+            truncated = truncated or o["truncated"]
+        island_info = {"islands": n_islands, "completed": sum("error" not in o for o in outs),
+                       "migration_interval": mig_every, "migration_size": mig_size}
 
     # ---------- 9) RESULTS ----------
     results = []
-    for ind in list(hof):
-        (score,), stats = _eval(ind)
-        expr = _tree_to_expr_str(individual=ind)
+    warm_items = []
+    seen_keys = set()
+    for tree_str, ((score,), stats) in sorted(finals, key=lambda f: f[1][0][0], reverse=True):
+        ind = gp.PrimitiveTree.from_string(tree_str, pset)
+        key = gp_subtree_keys(ind)[0][0]
+        if key in seen_keys:  # değişmeli operand sırası farklı, aynı strateji (ya da başka adada bulunmuş)
+            continue
+        seen_keys.add(key)
         results.append({
-            "expr": expr,
+            "expr": _tree_to_expr_str(individual=ind),
             "score": float(score),
             "stats": stats,
             "size": int(len(ind))
         })
-    results.sort(key=lambda x: x["score"], reverse=True)
+        if score > -1e9 and len(warm_items) < 20:
+            warm_items.append((score, {"tree": tree_str, "terminals": NAME_RENDER, "seed_expr": seed_expr}))
     best = results[0] if results else None
+    WARM_START.record(gp_fp, warm_items)
 
     return {
         "best": best,
@@ -4216,7 +6114,19 @@ def generate_strategy_gp(req: GPStrategyReq):
         "pop_size": pop_size,
         "generations": ngen,
         "objective": obj,
-        "seed_comparison": seed_expr
+        "seed_comparison": seed_expr,
+        "generations_completed": gens_done,
+        "evaluated": n_evals,
+        "truncated": truncated,
+        "warm_start": n_warm,
+        "subtree_cache": sub_cache.stats(),
+        "fitness_cache": {"entries": fit_entries, "hits": fit_hits},
+        "islands": island_info,
+        "fidelity": {"mode": fidelity, "cheap_evals": n_cheap, "full_evals": n_evals, "promote_fraction": promote},
+        "bloat": {"selection": selection, "max_height": max_height, "max_size": max_size},
+        "generation_stats": gen_stats,
+        "run_id": run_id,
+        "checkpoint_every": ckpt_every,
     }
 
 
@@ -0,0 +1,53 @@
+# tests/test_filters_suggest.py
+"""/filters/suggest uçtan uca: sentetik OHLCV (load_ohlcv yerine), BitMask'li _eval_mask/_metrics yolu."""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="oa_test_")
+os.environ.setdefault("EVAL_CACHE_PATH", os.path.join(_TMP, "eval_cache.sqlite"))
+os.environ.setdefault("WARM_START_PATH", os.path.join(_TMP, "warm_start.sqlite"))
+os.environ.setdefault("OPTUNA_STORAGE_PATH", os.path.join(_TMP, "optuna_studies"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import optimizer_api as oa  # noqa: E402
+
+
+def _ohlcv(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=n, freq="h")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"open": close, "high": close * 1.01, "low": close * 0.99,
+                         "close": close, "volume": 1.0}, index=idx)
+
+
+@pytest.fixture
+def req(monkeypatch):
+    df = _ohlcv()
+    monkeypatch.setattr(oa, "load_ohlcv", lambda *a, **k: df.copy())
+    monkeypatch.setattr(oa, "get_price_precision", lambda *a, **k: 4)
+    return dict(symbol="X", timeframe="1h", start="2024-01-01", end="2024-06-01", side=1,
+                tp=1.0, sl=1.0, leverage=1.0, fee_pct=0.05, slippage_pct=0.0,
+                expr="data['close'] > data['open'] * 0.9999", include=["ATR", "obv", "adl"],
+                samples=200, min_cov=0.05)
+
+
+@pytest.mark.parametrize("method", ["random", "tpe"])
+def test_filters_suggest_end_to_end(req, method):
+    out = oa.filters_suggest(oa.FilterSuggestReq(**req, method=method, method_params={"n_trials": 30}))
+    assert out["best"] is not None
+    assert out["best"]["coverage"] >= req["min_cov"]
+    assert set(out["best"]["intervals"]) <= set(out["columns"])
+
+
+def test_metrics_counts_set_bits():
+    # mask_pos popcount'u satır sayısı değil; coverage = seçilen / sinyal satırı
+    fdf = pd.DataFrame({"signal": [0, 1, -1, 0, 1, 1], "pnl": [0.0, 1.0, -1.0, 0.0, 2.0, -0.5]})
+    pos = oa.BitMask.from_bool(fdf["signal"].to_numpy() != 0)
+    sel = pos & oa.BitMask.from_bool(np.array([1, 1, 0, 1, 1, 0], dtype=bool))
+    m = oa._metrics(fdf, sel, pos, oa._FConf(tp=1.0, sl=2.0, min_cov=0.0, topk=1, samples=1))
+    assert (m["N"], m["wins"], m["coverage"], m["profit_sum"]) == (2, 2, 0.5, 3.0)
@@ -0,0 +1,114 @@
+# tests/test_optimize_core.py
+"""/optimize/core uçtan uca: sentetik snapshot üzerinde multi-fidelity yöntemleri."""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="oa_test_")
+os.environ.setdefault("EVAL_CACHE_PATH", os.path.join(_TMP, "eval_cache.sqlite"))
+os.environ.setdefault("WARM_START_PATH", os.path.join(_TMP, "warm_start.sqlite"))
+os.environ.setdefault("OPTUNA_STORAGE_PATH", os.path.join(_TMP, "optuna_studies"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import optimizer_api as oa  # noqa: E402
+
+
+def _ohlcv(n: int = 3000, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=n, freq="h")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"open": np.r_[close[0], close[:-1]], "high": close * 1.01, "low": close * 0.99,
+                         "close": close, "volume": 1.0}, index=idx)
+
+
+@pytest.fixture
+def make_req(monkeypatch):
+    monkeypatch.setattr(oa, "get_price_precision", lambda *a, **k: 4)
+    monkeypatch.setitem(oa.SNAPSHOT_STORE, "test-core", {"df": _ohlcv(), "meta": {}})
+
+    def _make(method, method_params):
+        return oa.OptimizeReq(
+            symbol="X", timeframe="1h", start="", end="", side=1, tp=0.01, sl=0.01, leverage=1.0,
+            fee_pct=0.05, slippage_pct=0.0, expr="(data['close'] > data['SMA']) * 1.0",
+            optimize={"sma_period": {"min": 5, "max": 200, "step": 5}},
+            method=method, method_params={"n_jobs": 1, **method_params}, data_snapshot_id="test-core")
+    return _make
+
+
+@pytest.mark.parametrize("method", ["halving", "hyperband"])
+def test_multi_fidelity_end_to_end(make_req, method):
+    out = oa.optimize_core(make_req(method, {}))
+    assert out["rungs"] == pytest.approx([0.2, 0.6, 1.0])
+    assert out["best"] is not None
+    assert out["evaluated"] == len(out["top"]) > 0
+    assert not out["truncated"]
+
+
+def test_halving_promotes_top_third(make_req):
+    # 40 aday -> 0.2'de 14 -> 0.6'da 5 -> sadece 5'i tam veride değerlendirilir
+    out = oa.optimize_core(make_req("halving", {"eta": 3, "min_fraction": 0.2}))
+    assert out["evaluated"] == 5
+    assert out["best"]["profit"] == max(r["profit"] for r in out["top"])
+
+
+def test_hyperband_max_evals_truncates(make_req):
+    out = oa.optimize_core(make_req("hyperband", {"samples": 30, "max_evals": 3, "seed": 0}))
+    assert out["truncated"]
+    assert out["evaluated"] == 3
+    assert out["best"] is not None
+
+
+def test_halving_with_samples(make_req):
+    out = oa.optimize_core(make_req("halving", {"samples": 12, "seed": 0}))
+    assert out["best"] is not None
+
+
+def _completed(out, storage=None):
+    study = oa.optuna.load_study(study_name=out["study"]["name"], storage=oa._optuna_storage(storage))
+    return study.get_trials(deepcopy=False, states=(oa.optuna.trial.TrialState.COMPLETE,))
+
+
+@pytest.fixture
+def make_tpe_req(make_req):
+    # sürekli uzay: TPE aynı noktayı tekrar önermez, her COMPLETE trial bir değerlendirme
+    def _make(method_params):
+        req = make_req("tpe", {"n_trials": 12, "n_startup_trials": 4, **method_params})
+        req.optimize = {"sma_period": {"min": 5.0, "max": 200.0}}
+        return req
+    return _make
+
+
+def test_tpe_workers_share_max_evals(make_tpe_req):
+    out = oa.optimize_core(make_tpe_req({"n_trials": 40, "n_workers": 2, "max_evals": 6}))
+    assert out["truncated"]
+    assert out["best"] is not None
+    # worker başına 3: toplam max_evals aşılmaz, tamamlananların hepsi toplanır
+    assert out["evaluated"] == len(_completed(out)) == 6
+
+
+def test_tpe_workers_max_seconds_keeps_best(make_tpe_req):
+    out = oa.optimize_core(make_tpe_req({"n_trials": 400, "n_workers": 2, "max_seconds": 1.5}))
+    assert out["truncated"]
+    assert out["best"] is not None
+    assert out["evaluated"] == len(_completed(out)) > 0
+
+
+@pytest.mark.parametrize("storage", ["journal", "sqlite"])
+def test_tpe_workers_persistent_storage_and_resume(make_tpe_req, storage):
+    def run(**mp):
+        req = make_tpe_req({"n_workers": 2, "storage": storage, **mp})
+        req.optimize = {"sma_period": {"min": 5.0, "max": 150.0}}  # ayrı parmak izi: diğer testlerin çalışmaları değil
+        return oa.optimize_core(req)
+
+    out = run()
+    assert out["evaluated"] == len(_completed(out, storage)) == 12
+    assert out["best"] is not None and not out["truncated"]
+
+    again = run(resume=True)
+    assert again["study"]["name"] == out["study"]["name"]
+    assert again["evaluated"] == 12  # sadece bu oturumun trial'ları
+    assert len(_completed(again, storage)) == 24
@@ -0,0 +1,34 @@
+# tests/test_trade_stats.py
+"""trade_stats_kernel: ragged (aday x trade) batch yolu tek aday yoluyla aynı sonucu vermeli."""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="oa_test_")
+os.environ.setdefault("EVAL_CACHE_PATH", os.path.join(_TMP, "eval_cache.sqlite"))
+os.environ.setdefault("WARM_START_PATH", os.path.join(_TMP, "warm_start.sqlite"))
+os.environ.setdefault("OPTUNA_STORAGE_PATH", os.path.join(_TMP, "optuna_studies"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import optimizer_api as oa  # noqa: E402
+
+
+def test_batch_matches_single():
+    rng = np.random.default_rng(0)
+    # boş segmentler başta, ortada ve sonda
+    pnls = ([np.zeros(0)] + [rng.normal(0.001, 0.02, int(n)) for n in rng.integers(1, 300, 50)]
+            + [np.zeros(0), rng.normal(0.0, 0.01, 1), np.zeros(0)])
+    batch = oa.stats_from_trades_batch(pnls)
+    assert len(batch) == len(pnls)
+    for p, b in zip(pnls, batch):
+        s = oa.stats_from_trades_basic(p)
+        assert b["trades"] == s["trades"] == p.size
+        assert b == pytest.approx(s, rel=1e-9, abs=1e-9)
+
+
+def test_batch_empty():
+    assert oa.stats_from_trades_batch([]) == []
+    assert oa.stats_from_trades_batch([np.zeros(0)])[0]["trades"] == 0